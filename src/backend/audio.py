@@ -1,25 +1,41 @@
+import asyncio
 import json
 import logging
+import os
 import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Generator, Tuple
+from typing import Any, AsyncGenerator, Callable, Generator, Tuple
 
 import numpy as np
-from elevenlabs import ElevenLabs
+from elevenlabs import AsyncElevenLabs, ElevenLabs
 from faster_whisper import WhisperModel
-from kokoro import KPipeline
+from kokoro import KModel, KPipeline
 from matplotlib.backend_bases import NonGuiException
-from openai import OpenAI
-from pydub import AudioSegment
-
+from openai import AsyncOpenAI, OpenAI
+
+from backend.audio_cache import audio_cache
+from backend.audio_data import AudioData
+from backend.fish_audio_references import FishAudioReferences
+from backend.model_registry import ModelKey, get_torch_device, model_registry
+from backend.pcm_stream import PCMStreamDecoder
+from backend.phoneme_cache import phoneme_cache
+from backend.tts_router import TTSRouter, get_fallback_providers
+from backend.tts_worker import TTS_WORKERS, WORKER_PROVIDERS, get_tts_worker_pool
+from backend.voice_library import (
+    convert_all_mp3_to_wav,
+    get_file_hash,
+    voice_library,
+    voice_path,
+)
 from util import const, get_language_code
 
 logger = logging.getLogger(__name__)
 
-voice_path = (
-    Path(__file__).parents[0] / Path("..") / Path("..") / Path("voice_references")
-)
-
 OPENAI_VOICES = [
     "alloy",
     "ballad",
@@ -33,68 +49,155 @@ OPENAI_VOICES = [
     "verse",
 ]
 
-KOKORO_VOICES = ["jf_alpha", "jf_gongitsune", "jf_nezumi", "jf_tebukuro", "jm_kumo"]
-
+ELEVENLABS_VOICE_ID = "GxxMAMfQkDlnqjpzjLHH"
+ELEVENLABS_REQUEST = {
+    "voice_id": ELEVENLABS_VOICE_ID,
+    "model_id": "eleven_flash_v2_5",
+    "output_format": "pcm_24000",
+}
 
-def _convert_mp3_to_wav(mp3_path: Path):
-    """
-    Convert mp3 to wav using pydub
-    """
+# Base URL of the ElevenLabs API, None for the default. The OpenAI client reads OPENAI_BASE_URL.
+ELEVENLABS_URL = os.getenv("LLA_AGENT_ELEVENLABS_URL")
+FISH_AUDIO_URL = os.getenv("LLA_AGENT_FISH_AUDIO_URL", "http://127.0.0.1:8080")
 
-    wav_path = mp3_path.with_suffix(".wav")
-    if not wav_path.exists():
-        audio = AudioSegment.from_mp3(mp3_path)
-        audio.export(wav_path, format="wav")
-    return wav_path
+fish_audio_references = FishAudioReferences(FISH_AUDIO_URL)
 
+WHISPER_MODEL = "large-v3"
 
-def _convert_all_mp3_to_wav():
-    """
-    Convert all mp3 files in the voice_path to wav
+KOKORO_VOICES = ["jf_alpha", "jf_gongitsune", "jf_nezumi", "jf_tebukuro", "jm_kumo"]
+KOKORO_REPO_ID = "hexgrad/Kokoro-82M"
+KOKORO_SPEED = 1
+KOKORO_SAMPLE_RATE = 24000
+# Split into sections so that the audio has some small pauses on punctuation
+KOKORO_SPLIT_PATTERN = r"(\.|。|!|\?|！|？|、)"
+KOKORO_MAX_PHONEMES = 510
+
+# Maximum number of concurrent requests per provider. API providers handle requests in parallel,
+# local engines share one model and would only compete for the same device. With worker
+# processes every worker has its own model.
+TTS_CONCURRENCY_LIMITS = {
+    const.TTS_OPENAI: 4,
+    const.TTS_ELEVENLABS: 4,
+    const.TTS_KOKORO: max(1, TTS_WORKERS),
+    const.TTS_FISH_AUDIO: 1,
+    const.TTS_CHATTERBOX: max(1, TTS_WORKERS),
+}
+
+_tts_executor = ThreadPoolExecutor(
+    max_workers=sum(TTS_CONCURRENCY_LIMITS.values()), thread_name_prefix="tts"
+)
+_tts_semaphores = {
+    provider: threading.BoundedSemaphore(limit)
+    for provider, limit in TTS_CONCURRENCY_LIMITS.items()
+}
+tts_router = TTSRouter(get_fallback_providers(), TTS_CONCURRENCY_LIMITS)
+
+# Shared HTTP clients of the API providers, keyed by provider
+# The async clients are bound to the event loop of the application
+ASYNC_CLIENT_PREFIX = "async "
+_clients: dict[str, Any] = dict()
+_clients_lock = threading.Lock()
+
+CHATTERBOX_EXAGGERATION = 0.5
+# The speaker conditioning is state of the model, so only one generation can run at a time
+_chatterbox_inference_lock = threading.Lock()
+
+# Speaker conditioning of the reference voices, persisted by the hash of the reference file
+chatterbox_conditionals_path = (
+    Path(__file__).parents[0]
+    / Path("..")
+    / Path("..")
+    / Path("cache")
+    / Path("chatterbox")
+)
+_chatterbox_conditionals: dict[str, Any] = dict()
+
+# Process wide pool of Kokoro pipelines, keyed by the kokoro language code
+# All pipelines use the model of the registry, they are dropped if the model is unloaded
+_kokoro_pipelines: dict[str, KPipeline] = dict()
+_kokoro_pipelines_lock = threading.Lock()
+# The pipelines share one model, so only one inference can run at a time
+_kokoro_inference_lock = threading.Lock()
+_kokoro_pool_stats = {
+    "constructions": 0,
+    "construction_time": 0.0,
+    "reuses": 0,
+}
+
+
+def _get_whisper_device() -> Tuple[str, str]:
+    """Get the device and compute type for whisper.
+    The GPU is used if one is available, otherwise int8 inference on the CPU.
     """
-    for file in voice_path.glob("*.mp3"):
-        _convert_mp3_to_wav(file)
+    import ctranslate2
+
+    if ctranslate2.get_cuda_device_count() > 0:
+        return "cuda", "float16"
+
+    return "cpu", "int8"
 
 
 def _transcribe_all_files():
-    model = WhisperModel("large-v3", device="cuda", compute_type="float16")
-    for file in voice_path.glob("*.wav"):
-        # Only transcribe if the json does not exist
-        if (file.with_suffix(".json")).exists():
-            logger.info(f"Skipping {file}")
-            continue
+    # Only transcribe if the json does not exist
+    files = [
+        file
+        for file in voice_path.glob("*.wav")
+        if not file.with_suffix(".json").exists()
+    ]
+
+    if len(files) == 0:
+        logger.info("All voice references are transcribed, skipping model loading")
+        return
+
+    device, compute_type = _get_whisper_device()
+    logger.info(
+        f"Transcribing {len(files)} voice references on {device} ({compute_type})"
+    )
 
-        segments, info = model.transcribe(str(file), beam_size=5)
+    whisper_model_key = ModelKey(
+        f"faster-whisper/{WHISPER_MODEL}", device, compute_type
+    )
 
-        text = ""
-        for segment in segments:
-            text += segment.text
+    with model_registry.use(
+        whisper_model_key,
+        lambda: WhisperModel(WHISPER_MODEL, device=device, compute_type=compute_type),
+    ) as model:
+        for file in files:
+            segments, info = model.transcribe(str(file), beam_size=5)
 
-        meta_data = {
-            "text": text,
-            "language": info.language,
-        }
+            text = ""
+            for segment in segments:
+                text += segment.text
 
-        try:
-            with open(file.with_suffix(".json"), "w", encoding="utf-8") as f:
-                json.dump(meta_data, f, indent=4, ensure_ascii=False)
-        except Exception as e:
-            logger.info(f"Error writing to file {file.with_suffix('.json')}: {e}")
-            # delete the file if it exists
-            if (file.with_suffix(".json")).exists():
-                (file.with_suffix(".json")).unlink()
-                logger.info(f"Deleted {file.with_suffix('.json')}")
+            meta_data = {
+                "text": text,
+                "language": info.language,
+            }
+
+            try:
+                with open(file.with_suffix(".json"), "w", encoding="utf-8") as f:
+                    json.dump(meta_data, f, indent=4, ensure_ascii=False)
+            except Exception as e:
+                logger.info(f"Error writing to file {file.with_suffix('.json')}: {e}")
+                # delete the file if it exists
+                if (file.with_suffix(".json")).exists():
+                    (file.with_suffix(".json")).unlink()
+                    logger.info(f"Deleted {file.with_suffix('.json')}")
+
+    # The model is only needed at startup, it is not kept until the budget is exceeded
+    model_registry.unload(whisper_model_key)
 
 
 def init_fish_audio_voice_samples():
     """
     Convert all mp3 files in the voice_path to wav and transcribe them
     """
-    _convert_all_mp3_to_wav()
+    convert_all_mp3_to_wav()
     _transcribe_all_files()
+    voice_library.invalidate()
 
 
-def get_fish_audio_voice_samples(language: str) -> list[dict[Path, str]]:
+def get_fish_audio_voice_samples(language: str) -> list[dict]:
     """
     Get the voice samples for a specific language
     """
@@ -103,20 +206,7 @@ def get_fish_audio_voice_samples(language: str) -> list[dict[Path, str]]:
         logger.info(f"Found no voices for language {language}")
         return []
 
-    # Get the files from voice_path and iterate over them
-    voice_samples = []
-    for file in voice_path.glob("*.json"):
-        with open(file, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if data["language"] == language_code:
-                voice_samples.append(
-                    {
-                        "audio_file": file.with_suffix(".wav"),
-                        "text": data["text"],
-                    }
-                )
-
-    return voice_samples
+    return voice_library.get(language_code)
 
 
 def _get_id_with_exluded_ids(num_voices: int, exclude_ids: list[int] = []) -> int:
@@ -139,68 +229,261 @@ def get_random_voice_id_for_provider(
     Get the voice samples for a specific language and TTS provider
     """
 
+    num_voices = _get_num_voices(tts_provider, language)
+
+    if num_voices is not None:
+        return _get_id_with_exluded_ids(num_voices, exclude_ids)
+
+    return NonGuiException
+
+
+def _get_num_voices(tts_provider: str, language: str) -> int | None:
+    """Get the number of voices of a provider, None if the voice can not be selected."""
     if tts_provider == const.TTS_KOKORO:
-        return _get_id_with_exluded_ids(len(KOKORO_VOICES), exclude_ids)
+        return len(KOKORO_VOICES)
 
     if tts_provider == const.TTS_OPENAI:
-        return _get_id_with_exluded_ids(len(OPENAI_VOICES), exclude_ids)
+        return len(OPENAI_VOICES)
 
     if tts_provider == const.TTS_FISH_AUDIO or tts_provider == const.TTS_CHATTERBOX:
-        return _get_id_with_exluded_ids(
-            len(get_fish_audio_voice_samples(language)), exclude_ids
+        return len(get_fish_audio_voice_samples(language))
+
+    return None
+
+
+def _map_voice_id(
+    tts_provider: str, fallback_provider: str, language: str, voice_id: int
+) -> int:
+    """Map a voice id of a provider to a voice of the fallback provider. Different voice ids
+    stay different as long as the fallback provider has enough voices."""
+    if fallback_provider == tts_provider or voice_id < 0:
+        return voice_id
+
+    num_voices = _get_num_voices(fallback_provider, language)
+    if not num_voices:
+        return -1
+
+    return voice_id % num_voices
+
+
+def _get_kokoro_lang_code(voice: str) -> str:
+    """The first letter of a kokoro voice name is the language code of the voice."""
+    return voice[0]
+
+
+def _get_kokoro_model_key() -> ModelKey:
+    import torch
+
+    # Kokoro does not support mps without the CPU fallback
+    return ModelKey(
+        f"kokoro/{KOKORO_REPO_ID}",
+        "cuda" if torch.cuda.is_available() else "cpu",
+        "float32",
+    )
+
+
+def _unload_kokoro_pipelines():
+    """Drop the pipelines, so that the unloaded model is not referenced anymore."""
+    with _kokoro_pipelines_lock:
+        _kokoro_pipelines.clear()
+
+
+def _get_kokoro_pipeline(lang_code: str, model: KModel) -> KPipeline:
+    """Get the pipeline for a language code from the pool.
+    The pipeline and the voice tensors of the language are only created on first use.
+
+    Args:
+        lang_code (str): The kokoro language code, e.g. "j" for japanese.
+        model (KModel): The shared model.
+
+    Returns:
+        KPipeline: The shared pipeline.
+    """
+    with _kokoro_pipelines_lock:
+        pipeline = _kokoro_pipelines.get(lang_code)
+
+        if pipeline is not None:
+            _kokoro_pool_stats["reuses"] += 1
+            return pipeline
+
+        start = time.perf_counter()
+
+        pipeline = KPipeline(lang_code=lang_code, repo_id=KOKORO_REPO_ID, model=model)
+
+        # Preload the voice tensors, otherwise they would be loaded on the first call
+        for voice in KOKORO_VOICES:
+            if _get_kokoro_lang_code(voice) == lang_code:
+                pipeline.load_voice(voice)
+
+        construction_time = time.perf_counter() - start
+
+        _kokoro_pool_stats["constructions"] += 1
+        _kokoro_pool_stats["construction_time"] += construction_time
+        _kokoro_pipelines[lang_code] = pipeline
+
+        logger.info(
+            f"Created Kokoro pipeline for language code {lang_code} in {construction_time:.2f}s"
         )
 
-    return NonGuiException
+    return pipeline
+
+
+@contextmanager
+def _use_kokoro_pipeline(lang_code: str) -> Generator[KPipeline, None, None]:
+    """Lease the Kokoro model from the registry and get the pipeline for a language code."""
+    key = _get_kokoro_model_key()
+
+    with model_registry.use(
+        key,
+        lambda: KModel(repo_id=KOKORO_REPO_ID).to(key.device).eval(),
+        _unload_kokoro_pipelines,
+    ) as model:
+        yield _get_kokoro_pipeline(lang_code, model)
+
+
+def init_kokoro_pipelines(warmup: bool = True):
+    """
+    Create the Kokoro pipelines for all known voices and optionally run a short inference
+    so that the first real request does not pay the initialization cost.
+    """
+    lang_codes = {_get_kokoro_lang_code(voice) for voice in KOKORO_VOICES}
+
+    for lang_code in lang_codes:
+        with _use_kokoro_pipeline(lang_code) as pipeline:
+            if warmup:
+                voice = next(
+                    voice
+                    for voice in KOKORO_VOICES
+                    if _get_kokoro_lang_code(voice) == lang_code
+                )
+                for _ in pipeline("あ", voice=voice, speed=1):
+                    pass
+
+
+def get_kokoro_pool_stats() -> dict:
+    """Get the statistics of the Kokoro pipeline pool.
+
+    Returns:
+        dict: Number of constructions and reuses, the time spent constructing pipelines,
+            the load time of the shared model and the estimated time that was saved by
+            reusing them.
+    """
+    with _kokoro_pipelines_lock:
+        stats = dict(_kokoro_pool_stats)
+
+    # The model is loaded by the registry, without the pool every pipeline loaded it
+    key = _get_kokoro_model_key()
+    stats["model_load_time"] = next(
+        (
+            model["load_time"]
+            for model in model_registry.stats()["models"]
+            if ModelKey(model["name"], model["device"], model["compute_type"]) == key
+        ),
+        0.0,
+    )
+
+    average_construction_time = (
+        stats["construction_time"] / stats["constructions"]
+        if stats["constructions"] > 0
+        else 0.0
+    )
+    stats["saved_time"] = (
+        average_construction_time + stats["model_load_time"]
+    ) * stats["reuses"]
+
+    return stats
 
 
 def _generate_audio_kokoro(
     text: str, language: str, voice_id: int = -1
-) -> Generator[Tuple[int, np.ndarray], None, None]:
-    pipeline = KPipeline(lang_code="j", repo_id="hexgrad/Kokoro-82M")
-
+) -> Generator[AudioData, None, None]:
     if voice_id < 0:
         voice_id = get_random_voice_id_for_provider(const.TTS_KOKORO, language)
 
-    generator = pipeline(
-        text,
-        voice=KOKORO_VOICES[voice_id],
-        speed=1,
-        # Split into sections so that the audio has some small pauses on punctuation
-        split_pattern=r"(\.|。|!|\?|！|？|、)",
-    )
+    voice = KOKORO_VOICES[voice_id]
+    lang_code = _get_kokoro_lang_code(voice)
 
-    for gs, ps, audio in generator:
-        yield (24000, audio.numpy())
+    with _use_kokoro_pipeline(lang_code) as pipeline, _kokoro_inference_lock:
+        for ps in _phonemize_kokoro(pipeline, lang_code, text):
+            for _, _, audio in pipeline.generate_from_tokens(
+                ps, voice=voice, speed=KOKORO_SPEED
+            ):
+                yield AudioData(KOKORO_SAMPLE_RATE, audio.numpy())
+
+
+def _phonemize_kokoro(pipeline: KPipeline, lang_code: str, text: str) -> list[str]:
+    """Split a text into sections in the same way as the pipeline and convert them to phonemes.
+    The phonemes of every section are cached."""
+    phonemes = []
+
+    for section in re.split(KOKORO_SPLIT_PATTERN, text.strip()):
+        if not section.strip():
+            continue
+
+        ps = phoneme_cache.get_phonemes(
+            lang_code, section, lambda section: pipeline.g2p(section)[0] or ""
+        )
+        if not ps:
+            continue
+
+        if len(ps) > KOKORO_MAX_PHONEMES:
+            logger.warning(
+                f"Truncating {len(ps)} phonemes to {KOKORO_MAX_PHONEMES} phonemes"
+            )
+            ps = ps[:KOKORO_MAX_PHONEMES]
+
+        phonemes.append(ps)
+
+    return phonemes
+
+
+def _get_client(name: str, factory: Callable[[], Any]) -> Any:
+    """Get a shared client. The clients keep their connections alive between requests."""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = factory()
+
+        return _clients[name]
 
 
 def _generate_audio_elevenlabs(
     text: str,
-) -> Generator[Tuple[int, np.ndarray], None, None]:
-    from io import BytesIO
+) -> Generator[AudioData, None, None]:
+    client = _get_client(
+        const.TTS_ELEVENLABS, lambda: ElevenLabs(base_url=ELEVENLABS_URL)
+    )
 
-    client = ElevenLabs()
+    audio = client.text_to_speech.stream(text=text, **ELEVENLABS_REQUEST)
 
-    audio = client.text_to_speech.convert(
-        text=text,
-        voice_id="GxxMAMfQkDlnqjpzjLHH",
-        model_id="eleven_flash_v2_5",
-        output_format="pcm_24000",
+    decoder = PCMStreamDecoder(sample_rate=24000)
+
+    for chunk in audio:
+        if chunk:
+            yield from decoder.feed(chunk)
+
+    yield from decoder.flush()
+
+
+async def _agenerate_audio_elevenlabs(
+    text: str,
+) -> AsyncGenerator[AudioData, None]:
+    client = _get_client(
+        ASYNC_CLIENT_PREFIX + const.TTS_ELEVENLABS,
+        lambda: AsyncElevenLabs(base_url=ELEVENLABS_URL),
     )
 
-    stream = BytesIO()
+    decoder = PCMStreamDecoder(sample_rate=24000)
 
-    for chunk in audio:
+    async for chunk in client.text_to_speech.stream(text=text, **ELEVENLABS_REQUEST):
         if chunk:
-            stream.write(chunk)
-    stream.seek(0)
+            for audio in decoder.feed(chunk):
+                yield audio
 
-    # return_audio = np.frombuffer(audio, dtype=np.int16)
-    yield (24000, np.frombuffer(stream.getbuffer(), dtype=np.int16))
+    for audio in decoder.flush():
+        yield audio
 
 
-def _generate_audio_openai(
-    text: str, language: str, voice_id: int = -1
-) -> Generator[Tuple[int, np.ndarray], None, None]:
+def _get_openai_request(text: str, language: str, voice_id: int = -1) -> dict:
     instructions = f"""Language: Speak in {language} with a standard accent.
 
                 Voice Affect: Composed; project authority and confidence.
@@ -214,137 +497,505 @@ def _generate_audio_openai(
     if voice_id < 0:
         voice_id = random.randint(0, len(OPENAI_VOICES) - 1)
 
-    client = OpenAI()
-    response = client.audio.speech.create(
-        model="gpt-4o-mini-tts",
-        voice=OPENAI_VOICES[voice_id],
-        input=text,
-        instructions=instructions,
-        response_format="pcm",
-    )
-    return_audio = np.frombuffer(response.content, dtype=np.int16)
+    return {
+        "model": "gpt-4o-mini-tts",
+        "voice": OPENAI_VOICES[voice_id],
+        "input": text,
+        "instructions": instructions,
+        "response_format": "pcm",
+    }
 
-    yield (24000, return_audio)
 
+def _generate_audio_openai(
+    text: str, language: str, voice_id: int = -1
+) -> Generator[AudioData, None, None]:
+    client = _get_client(const.TTS_OPENAI, OpenAI)
 
-def _generate_audio_chatterbox(
+    decoder = PCMStreamDecoder(sample_rate=24000)
+
+    with client.audio.speech.with_streaming_response.create(
+        **_get_openai_request(text, language, voice_id)
+    ) as response:
+        for chunk in response.iter_bytes():
+            yield from decoder.feed(chunk)
+
+    yield from decoder.flush()
+
+
+async def _agenerate_audio_openai(
     text: str, language: str, voice_id: int = -1
-) -> Generator[Tuple[int, np.ndarray], None, None]:
+) -> AsyncGenerator[AudioData, None]:
+    client = _get_client(ASYNC_CLIENT_PREFIX + const.TTS_OPENAI, AsyncOpenAI)
+
+    decoder = PCMStreamDecoder(sample_rate=24000)
+
+    async with client.audio.speech.with_streaming_response.create(
+        **_get_openai_request(text, language, voice_id)
+    ) as response:
+        async for chunk in response.iter_bytes():
+            for audio in decoder.feed(chunk):
+                yield audio
+
+    for audio in decoder.flush():
+        yield audio
+
+
+def _load_chatterbox_model(device: str):
     from chatterbox.mtl_tts import ChatterboxMultilingualTTS
 
-    device = "cuda"
+    return ChatterboxMultilingualTTS.from_pretrained(device=device)
+
+
+def _unload_chatterbox_conditionals():
+    """Drop the speaker conditionings, so that their tensors on the device of the unloaded
+    model are freed. They are loaded from the disk cache again on the next use."""
+    _chatterbox_conditionals.clear()
+
+
+def _use_chatterbox_model():
+    """Lease the shared Chatterbox model from the registry, it is only loaded on first use."""
+    key = ModelKey("chatterbox/multilingual", get_torch_device(), "float32")
+
+    return model_registry.use(
+        key, lambda: _load_chatterbox_model(key.device), _unload_chatterbox_conditionals
+    )
+
 
+def warmup_chatterbox():
+    """Load the Chatterbox model and run a short inference with its default voice."""
+    with _use_chatterbox_model() as model, _chatterbox_inference_lock:
+        model.generate("Hello.", language_id="en")
+
+
+def _get_chatterbox_conditionals(model, audio_prompt_path: Path):
+    """Get the speaker conditioning of a reference voice.
+
+    The conditioning is only computed once per reference file and stored on disk, so that
+    it is also reused after a restart. Must be called while holding the inference lock.
+    """
+    from chatterbox.mtl_tts import Conditionals
+
+    key = f"{get_file_hash(audio_prompt_path)}_{CHATTERBOX_EXAGGERATION}"
+
+    conditionals = _chatterbox_conditionals.get(key)
+    if conditionals is not None:
+        return conditionals
+
+    file = chatterbox_conditionals_path / f"{key}.pt"
+
+    if file.exists():
+        conditionals = Conditionals.load(file, map_location=model.device)
+    else:
+        start = time.perf_counter()
+        model.prepare_conditionals(
+            str(audio_prompt_path), exaggeration=CHATTERBOX_EXAGGERATION
+        )
+        conditionals = model.conds
+
+        chatterbox_conditionals_path.mkdir(parents=True, exist_ok=True)
+        tmp_file = file.with_suffix(".tmp")
+        conditionals.save(tmp_file)
+        os.replace(tmp_file, file)
+
+        logger.info(
+            f"Prepared the Chatterbox conditioning of {audio_prompt_path} in {time.perf_counter() - start:.2f}s"
+        )
+
+    _chatterbox_conditionals[key] = conditionals
+
+    return conditionals
+
+
+def _generate_audio_chatterbox(
+    text: str, language: str, voice_id: int = -1
+) -> Generator[AudioData, None, None]:
     voices = get_fish_audio_voice_samples(language)
 
+    if len(voices) == 0:
+        raise ValueError(f"There are no voice references for {language}")
+
     if voice_id < 0:
         voice_id = random.randint(0, len(voices) - 1)
 
-    if len(voices) != 0:
-        # Select a random voice from the list
-        voice = voices[voice_id]
+    # Select a random voice from the list
+    voice = voices[voice_id]
 
-        audio_prompt_path = voice["audio_file"]
+    audio_prompt_path = voice["audio_file"]
 
-        multilingual_model = ChatterboxMultilingualTTS.from_pretrained(device=device)
+    logger.info(
+        f"Generating audio with Chatterbox using voice sample {audio_prompt_path} for language {language} ({get_language_code(language)})"
+    )
 
-        logger.info(
-            f"Generating audio with Chatterbox using voice sample {audio_prompt_path} for language {language} ({get_language_code(language)})"
+    with _use_chatterbox_model() as multilingual_model, _chatterbox_inference_lock:
+        multilingual_model.conds = _get_chatterbox_conditionals(
+            multilingual_model, audio_prompt_path
         )
 
         generated_wav = multilingual_model.generate(
             text,
             language_id=get_language_code(language),
-            audio_prompt_path=audio_prompt_path,
+            exaggeration=CHATTERBOX_EXAGGERATION,
         )
 
-    yield (multilingual_model.sr, generated_wav.numpy()[0])
+    yield AudioData.from_array(multilingual_model.sr, generated_wav.numpy()[0])
 
 
 def _generate_audio_fish_audio(
     text: str, language: str, voice_id: int = -1
-) -> Generator[Tuple[int, np.ndarray], None, None]:
-    import io
-    import wave
+) -> Generator[AudioData, None, None]:
+    from fish_audio_sdk import Session, TTSRequest
 
-    from fish_audio_sdk import ReferenceAudio, Session, TTSRequest
-
-    client = Session(apikey="LOCAL", base_url="http://127.0.0.1:8080")
-
-    wave_file = io.BytesIO()
+    client = _get_client(
+        const.TTS_FISH_AUDIO,
+        lambda: Session(apikey="LOCAL", base_url=FISH_AUDIO_URL),
+    )
 
     voices = get_fish_audio_voice_samples(language)
 
     if voice_id < 0:
         voice_id = random.randint(0, len(voices) - 1)
 
+    request = TTSRequest(text=text, format="wav")
+
     if len(voices) != 0:
         # Select a random voice from the list
         voice = voices[voice_id]
 
-        # Prepare the voice reference
+        # The voice is registered on the server once and afterwards only addressed by its id
+        request.reference_id = fish_audio_references.get_reference_id(voice)
+        if request.reference_id is None:
+            request.references = [fish_audio_references.get_reference_audio(voice)]
 
-        audio_path = voice["audio_file"]
+    # The sample rate and channels are read from the WAV header at the start of the stream
+    decoder = PCMStreamDecoder(wav_header=True)
 
-        # Read wav file to bytes
-        with open(audio_path, "rb") as f:
-            voice_audio = f.read()
+    try:
+        for chunk in client.tts(request):
+            yield from decoder.feed(chunk)
+    except Exception:
+        # The server could have lost the reference
+        if request.reference_id is not None:
+            fish_audio_references.invalidate()
+        raise
 
-        references = [
-            ReferenceAudio(
-                audio=voice_audio,
-                text=voice["text"],
-            )
-        ]
-    else:
-        references = []
+    yield from decoder.flush()
 
-    for chunk in client.tts(TTSRequest(text=text, format="wav", references=references)):
-        wave_file.write(chunk)
-    wave_file.seek(0)
 
-    with wave.open(wave_file, "rb") as wav_file:
-        num_channels = wav_file.getnchannels()
-        framerate = wav_file.getframerate()
-        num_frames = wav_file.getnframes()
+def _get_voice_reference(tts_provider: str, language: str, voice_id: int) -> str:
+    """Get a stable identifier of the voice which is used for a voice id."""
+    if tts_provider == const.TTS_KOKORO:
+        return KOKORO_VOICES[voice_id]
 
-        audio_data = wav_file.readframes(num_frames)
+    if tts_provider == const.TTS_OPENAI:
+        return OPENAI_VOICES[voice_id]
 
-        audio_np = np.frombuffer(audio_data, dtype=np.int16)
+    if tts_provider == const.TTS_ELEVENLABS:
+        return ELEVENLABS_VOICE_ID
 
-        # If stereo (2 channels), reshape to [num_frames, 2] array
-        if num_channels == 2:
-            audio_np = audio_np.reshape(-1, 2)
+    if tts_provider == const.TTS_FISH_AUDIO or tts_provider == const.TTS_CHATTERBOX:
+        voices = get_fish_audio_voice_samples(language)
+        if len(voices) == 0:
+            return ""
+        return voices[voice_id]["audio_file"].name
 
-    yield (framerate, audio_np)
+    return ""
 
 
-def generate_audio(
+def _generate_audio_provider(
     tts_provider: str, text: str, language: str, voice_id: int = -1
-) -> Generator[Tuple[int, np.ndarray], None, None]:
-    logger.info(
-        f"Generating audio with {tts_provider} for language {language} and voice_id {voice_id}"
-    )
+) -> Generator[AudioData, None, None]:
+    tts_worker_pool = get_tts_worker_pool()
+    if tts_worker_pool is not None and tts_provider in WORKER_PROVIDERS:
+        yield from tts_worker_pool.generate(tts_provider, text, language, voice_id)
+        return
+
+    yield from _generate_audio_engine(tts_provider, text, language, voice_id)
 
+
+def _generate_audio_engine(
+    tts_provider: str, text: str, language: str, voice_id: int = -1
+) -> Generator[AudioData, None, None]:
     if tts_provider == const.TTS_KOKORO:
-        for sr, audio_np in _generate_audio_kokoro(text, language, voice_id=voice_id):
-            yield (sr, audio_np)
+        yield from _generate_audio_kokoro(text, language, voice_id=voice_id)
 
     if tts_provider == const.TTS_ELEVENLABS:
-        for sr, audio_np in _generate_audio_elevenlabs(text):
-            yield (sr, audio_np)
+        yield from _generate_audio_elevenlabs(text)
 
     if tts_provider == const.TTS_OPENAI:
-        for sr, audio_np in _generate_audio_openai(text, language, voice_id=voice_id):
-            yield (sr, audio_np)
+        yield from _generate_audio_openai(text, language, voice_id=voice_id)
 
     if tts_provider == const.TTS_FISH_AUDIO:
-        for sr, audio_np in _generate_audio_fish_audio(
-            text, language, voice_id=voice_id
-        ):
-            yield (sr, audio_np)
+        yield from _generate_audio_fish_audio(text, language, voice_id=voice_id)
 
     if tts_provider == const.TTS_CHATTERBOX:
-        for sr, audio_np in _generate_audio_chatterbox(
-            text, language, voice_id=voice_id
+        yield from _generate_audio_chatterbox(text, language, voice_id=voice_id)
+
+
+def _get_cache_key(
+    tts_provider: str, text: str, language: str, voice_id: int
+) -> Tuple[int, str]:
+    """Resolve the voice of a request and create its cache key.
+
+    Returns:
+        Tuple[int, str]: The resolved voice id and the cache key.
+    """
+    # The voice needs to be fixed before the lookup, otherwise the key would be ambiguous
+    if voice_id < 0 and tts_provider != const.TTS_ELEVENLABS:
+        voice_id = get_random_voice_id_for_provider(tts_provider, language)
+
+    key = audio_cache.make_key(
+        tts_provider,
+        _get_voice_reference(tts_provider, language, voice_id),
+        language,
+        KOKORO_SPEED if tts_provider == const.TTS_KOKORO else 1,
+        text,
+    )
+
+    return voice_id, key
+
+
+def generate_audio(
+    tts_provider: str,
+    text: str,
+    language: str,
+    voice_id: int = -1,
+    use_cache: bool = True,
+) -> Generator[AudioData, None, None]:
+    logger.info(
+        f"Generating audio with {tts_provider} for language {language} and voice_id {voice_id}"
+    )
+
+    voice_id, key = _get_cache_key(tts_provider, text, language, voice_id)
+
+    cached_audio = audio_cache.get(key) if use_cache else None
+    if cached_audio is not None:
+        logger.info(f"Audio cache hit ({audio_cache.stats()})")
+        yield cached_audio
+        return
+
+    chunks = []
+    for audio_data in _generate_audio_provider(
+        tts_provider, text, language, voice_id=voice_id
+    ):
+        chunks.append(audio_data.data)
+        yield audio_data
+
+    if use_cache and len(chunks) > 0:
+        audio_cache.put(key, AudioData(audio_data.sample_rate, np.concatenate(chunks)))
+
+
+def _generate_audio_limited(
+    tts_provider: str, text: str, language: str, voice_id: int = -1
+) -> Generator[AudioData, None, None]:
+    """generate_audio which respects the provider concurrency limit."""
+    semaphore = _tts_semaphores.get(tts_provider)
+
+    if semaphore is None:
+        yield from generate_audio(tts_provider, text, language, voice_id)
+        return
+
+    with semaphore:
+        yield from generate_audio(tts_provider, text, language, voice_id)
+
+
+async def _iterate_in_executor(
+    generator: Generator, max_buffered_chunks: int
+) -> AsyncGenerator:
+    """Run a blocking generator on the TTS executor and iterate over it asynchronously.
+
+    At most max_buffered_chunks items are buffered. If the consumer is slower, the
+    generator is paused until there is space in the queue again.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=max_buffered_chunks)
+    stop = threading.Event()
+    end = object()
+
+    def produce():
+        try:
+            for item in generator:
+                if stop.is_set():
+                    break
+                asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+        except Exception as e:
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+        finally:
+            generator.close()
+            if not stop.is_set():
+                asyncio.run_coroutine_threadsafe(queue.put(end), loop).result()
+
+    producer = loop.run_in_executor(_tts_executor, produce)
+
+    try:
+        while True:
+            item = await queue.get()
+
+            if item is end:
+                break
+
+            if isinstance(item, Exception):
+                raise item
+
+            yield item
+    finally:
+        stop.set()
+        # Unblock the producer if it waits for space in the queue
+        while not queue.empty():
+            queue.get_nowait()
+
+    await producer
+
+
+async def agenerate_audio(
+    tts_provider: str,
+    text: str,
+    language: str,
+    voice_id: int = -1,
+    max_buffered_chunks: int = 8,
+) -> AsyncGenerator[AudioData, None]:
+    """Asynchronous version of generate_audio which never blocks the event loop.
+
+    The request is routed by the tts_router, if the provider fails or misses its deadline the
+    audio is generated by a fallback provider. The API providers use their async clients. The
+    local engines run on the TTS executor and are paused once max_buffered_chunks chunks are
+    waiting for the consumer.
+    """
+    async for chunk in tts_router.stream(
+        tts_provider,
+        lambda provider: _agenerate_audio_provider(
+            provider,
+            text,
+            language,
+            _map_voice_id(tts_provider, provider, language, voice_id),
+            max_buffered_chunks,
+        ),
+    ):
+        yield chunk
+
+
+async def _agenerate_audio_provider(
+    tts_provider: str,
+    text: str,
+    language: str,
+    voice_id: int,
+    max_buffered_chunks: int,
+) -> AsyncGenerator[AudioData, None]:
+    if tts_provider not in [const.TTS_OPENAI, const.TTS_ELEVENLABS]:
+        async for chunk in _iterate_in_executor(
+            _generate_audio_limited(tts_provider, text, language, voice_id),
+            max_buffered_chunks,
         ):
-            yield (sr, audio_np)
+            yield chunk
+        return
+
+    logger.info(
+        f"Generating audio with {tts_provider} for language {language} and voice_id {voice_id}"
+    )
+
+    voice_id, key = _get_cache_key(tts_provider, text, language, voice_id)
+
+    cached_audio = audio_cache.get(key)
+    if cached_audio is not None:
+        logger.info(f"Audio cache hit ({audio_cache.stats()})")
+        yield cached_audio
+        return
+
+    if tts_provider == const.TTS_OPENAI:
+        generator = _agenerate_audio_openai(text, language, voice_id=voice_id)
+    else:
+        generator = _agenerate_audio_elevenlabs(text)
+
+    chunks = []
+    async for audio_data in generator:
+        chunks.append(audio_data.data)
+        yield audio_data
+
+    if len(chunks) > 0:
+        await asyncio.to_thread(
+            audio_cache.put,
+            key,
+            AudioData(audio_data.sample_rate, np.concatenate(chunks)),
+        )
+
+
+async def _render_audio(
+    tts_provider: str, text: str, language: str, voice_id: int = -1
+) -> list[AudioData]:
+    """Render the complete audio of a text."""
+    return [
+        chunk async for chunk in agenerate_audio(tts_provider, text, language, voice_id)
+    ]
+
+
+async def generate_audio_segments(
+    tts_provider: str, language: str, segments: list[Tuple[str, int]]
+) -> list[list[AudioData]]:
+    """Render multiple texts concurrently.
+
+    Args:
+        tts_provider (str): The TTS provider.
+        language (str): The language of the texts.
+        segments (list[Tuple[str, int]]): The texts alongside the voice id which should be used.
+
+    Returns:
+        list[list[AudioData]]: The audio chunks of every segment in the order of
+            the input segments.
+    """
+    return await asyncio.gather(
+        *_submit_audio_segments(tts_provider, language, segments)
+    )
+
+
+async def stream_audio_segments(
+    tts_provider: str, language: str, segments: list[Tuple[str, int]]
+) -> AsyncGenerator[list[AudioData], None]:
+    """Render multiple texts concurrently but yield them in order as soon as the next
+    segment is ready.
+
+    Args:
+        tts_provider (str): The TTS provider.
+        language (str): The language of the texts.
+        segments (list[Tuple[str, int]]): The texts alongside the voice id which should be used.
+
+    Yields:
+        list[AudioData]: The audio chunks of the next segment.
+    """
+    futures = _submit_audio_segments(tts_provider, language, segments)
+
+    try:
+        for future in futures:
+            yield await future
+    finally:
+        # Segments which have not started yet are not needed anymore
+        for future in futures:
+            future.cancel()
+
+
+def _submit_audio_segments(
+    tts_provider: str, language: str, segments: list[Tuple[str, int]]
+) -> list[asyncio.Task]:
+    return [
+        asyncio.create_task(_render_audio(tts_provider, text, language, voice_id))
+        for text, voice_id in segments
+    ]
+
+
+def get_audio_cache_stats() -> dict:
+    """Get the hit and miss counters of the audio cache."""
+    return audio_cache.stats()
+
+
+def get_tts_router_stats() -> dict:
+    """Get the rolling provider statistics and the routing decisions of the TTS router."""
+    return tts_router.stats()
+
+
+def get_phoneme_cache_stats() -> dict:
+    """Get the hit counters of the phoneme cache of the local engines."""
+    return phoneme_cache.stats()
+
+
+def get_model_registry_stats() -> dict:
+    """Get the resident set of the loaded models and the memory budget."""
+    return model_registry.stats()
@@ -0,0 +1,125 @@
+import numpy as np
+
+from backend.audio_data import AudioData, float_to_int16, int16_to_float32
+
+
+class AudioAssembler:
+    """Collects audio segments and silence gaps and writes them into one buffer.
+
+    The segments are only referenced until build is called. The sample rate and dtype are
+    resolved once from the collected segments, the output buffer is allocated with the final
+    size and every segment is copied exactly once.
+    """
+
+    def __init__(self, dtype: np.dtype | None = None):
+        """
+        Args:
+            dtype (np.dtype | None, optional): int16 or float32 to force the dtype of the
+                output. By default the dtype of the segments is used.
+        """
+        # Either an audio array or the length of a silence gap in seconds
+        self._parts: list[np.ndarray | float] = []
+        self._sample_rate: int | None = None
+        self._dtype = np.dtype(dtype) if dtype is not None else None
+        # Sample position of every part, resolved by build
+        self._positions: list[int] | None = None
+
+    @property
+    def sample_rate(self) -> int | None:
+        return self._sample_rate
+
+    def add_segment(self, sr: int, audio: np.ndarray):
+        """Add an audio segment.
+
+        Args:
+            sr (int): The sample rate of the segment.
+            audio (np.ndarray): The audio data of the segment.
+        """
+        if self._sample_rate is None:
+            self._sample_rate = sr
+        elif self._sample_rate != sr:
+            raise ValueError(
+                f"Audio segment has a sample rate of {sr} but {self._sample_rate} was expected"
+            )
+
+        self._parts.append(AudioData.from_array(sr, audio).data)
+
+    def add_silence(self, seconds: float):
+        """Add a silence gap. The length is resolved with the sample rate of the segments.
+
+        Args:
+            seconds (float): The length of the silence in seconds.
+        """
+        self._parts.append(seconds)
+
+    def mark(self) -> int:
+        """Mark the current end of the audio. The marker is resolved to a sample position
+        with sample_position after build."""
+        return len(self._parts)
+
+    def sample_position(self, marker: int) -> int:
+        """Get the sample position of a marker in the built audio.
+
+        Args:
+            marker (int): A marker returned by mark.
+
+        Raises:
+            RuntimeError: If build was not called.
+
+        Returns:
+            int: The sample position.
+        """
+        if self._positions is None:
+            raise RuntimeError("The sample positions are only known after build")
+
+        return self._positions[marker]
+
+    def _resolve_dtype(self, segments: list[np.ndarray]) -> np.dtype:
+        if self._dtype is not None:
+            return self._dtype
+
+        dtypes = {segment.dtype for segment in segments}
+
+        if len(dtypes) == 1:
+            return dtypes.pop()
+
+        # Mixed integer and float audio is converted to float samples in the range [-1, 1]
+        return np.dtype(np.float32)
+
+    def build(self) -> AudioData | None:
+        """Write all parts into a single buffer.
+
+        Returns:
+            AudioData | None: The assembled audio or None if no segment was added.
+        """
+        segments = [part for part in self._parts if isinstance(part, np.ndarray)]
+
+        if self._sample_rate is None or len(segments) == 0:
+            return None
+
+        sr = self._sample_rate
+        dtype = self._resolve_dtype(segments)
+        channel_shape = segments[0].shape[1:]
+
+        lengths = [
+            len(part) if isinstance(part, np.ndarray) else int(part * sr)
+            for part in self._parts
+        ]
+
+        buffer = np.zeros((sum(lengths),) + channel_shape, dtype=dtype)
+
+        self._positions = [0]
+        position = 0
+        for part, length in zip(self._parts, lengths):
+            if isinstance(part, np.ndarray):
+                if part.dtype == dtype:
+                    buffer[position : position + length] = part
+                elif dtype == np.int16:
+                    buffer[position : position + length] = float_to_int16(part)
+                else:
+                    buffer[position : position + length] = int16_to_float32(part)
+            # Silence is already zero
+            position += length
+            self._positions.append(position)
+
+        return AudioData(sr, buffer)
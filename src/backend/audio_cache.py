@@ -0,0 +1,189 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+
+from backend.audio_data import AudioData
+
+logger = logging.getLogger(__name__)
+
+cache_path = (
+    Path(__file__).parents[0] / Path("..") / Path("..") / Path("cache") / Path("tts")
+)
+
+DEFAULT_MAX_SIZE_MB = 1024
+
+
+def normalize_text(text: str) -> str:
+    """Normalize a text so that trivially different inputs share one cache entry."""
+    text = unicodedata.normalize("NFKC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class AudioCache:
+    """Persistent, content addressed cache for generated audio.
+
+    Every entry is stored as a single int16 ``.npy`` file which is memory-mapped on read.
+    The file name contains the key digest, the sample rate and the dtype the audio was
+    generated with, so that the original dtype can be restored on a hit.
+    The least recently used entries are removed once the size limit is exceeded.
+    """
+
+    def __init__(self, path: Path = cache_path, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        self.path = path
+        self.max_size = max_size_mb * 1024 * 1024
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        # digest -> (file, size), ordered from least to most recently used
+        self._entries: OrderedDict[str, tuple[Path, int]] = OrderedDict()
+        self._size = 0
+        self._loaded = False
+
+    def _load(self):
+        """Build the index from the files on disk. The mtime is used as the access time."""
+        if self._loaded:
+            return
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        files = sorted(self.path.glob("*.npy"), key=lambda file: file.stat().st_mtime)
+        for file in files:
+            size = file.stat().st_size
+            self._entries[file.name.split("_")[0]] = (file, size)
+            self._size += size
+
+        self._loaded = True
+
+    def _remove(self, file: Path) -> bool:
+        # On Windows a file cannot be removed while it is memory-mapped by a reader
+        try:
+            file.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"Failed to remove cached audio {file}: {e}")
+            return False
+
+        return True
+
+    def _evict(self):
+        if self._size <= self.max_size:
+            return
+
+        # Entries whose file cannot be removed are kept and evicted by a later put
+        for digest, (file, size) in list(self._entries.items()):
+            if self._size <= self.max_size:
+                break
+
+            if not self._remove(file):
+                continue
+
+            del self._entries[digest]
+            self._size -= size
+            logger.debug(f"Evicted {file} from the audio cache")
+
+    @staticmethod
+    def make_key(
+        tts_provider: str, voice: str, language: str, speed: float, text: str
+    ) -> str:
+        """Create the digest which identifies a generated audio."""
+        key = "\x1f".join(
+            [tts_provider, voice, language.lower(), f"{speed:g}", normalize_text(text)]
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> AudioData | None:
+        """Get an entry from the cache.
+
+        Args:
+            key (str): The digest created by make_key.
+
+        Returns:
+            AudioData | None: The audio or None if there is no entry.
+        """
+        with self._lock:
+            self._load()
+
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        file = entry[0]
+        _, sr, dtype = file.stem.split("_")
+
+        try:
+            audio = np.load(file, mmap_mode="r")
+            os.utime(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to read cached audio {file}: {e}")
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._size -= entry[1]
+            return None
+
+        audio_data = AudioData(int(sr), audio)
+        return audio_data.to_float32() if dtype == "float32" else audio_data
+
+    def put(self, key: str, audio_data: AudioData):
+        """Store an entry in the cache.
+
+        Args:
+            key (str): The digest created by make_key.
+            audio_data (AudioData): The audio.
+        """
+        with self._lock:
+            self._load()
+
+        sr, audio = audio_data
+        file = self.path / f"{key}_{sr}_{audio.dtype.name}.npy"
+        tmp_file = file.with_suffix(f".{threading.get_ident()}.tmp")
+
+        try:
+            with open(tmp_file, "wb") as f:
+                np.save(f, audio_data.to_int16().data)
+            os.replace(tmp_file, file)
+        except OSError as e:
+            logger.warning(f"Failed to write cached audio {file}: {e}")
+            tmp_file.unlink(missing_ok=True)
+            return
+
+        size = file.stat().st_size
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous[1]
+                if previous[0] != file:
+                    self._remove(previous[0])
+
+            self._entries[key] = (file, size)
+            self._size += size
+            self._evict()
+
+    def stats(self) -> dict:
+        """Get the hit and miss counters and the current size of the cache."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+                "entries": len(self._entries),
+                "size": self._size,
+            }
+
+
+audio_cache = AudioCache(
+    max_size_mb=int(os.getenv("LLA_AGENT_TTS_CACHE_SIZE_MB", DEFAULT_MAX_SIZE_MB))
+)
@@ -0,0 +1,64 @@
+from typing import NamedTuple
+
+import numpy as np
+
+INT16_SCALE = 32767
+
+
+def float_to_int16(audio: np.ndarray) -> np.ndarray:
+    """Convert float samples in the range [-1, 1] to int16. Samples outside are clipped."""
+    return (np.clip(audio, -1.0, 1.0) * INT16_SCALE).astype(np.int16)
+
+
+def int16_to_float32(audio: np.ndarray) -> np.ndarray:
+    """Convert int16 samples to float32 samples in the range [-1, 1]."""
+    return audio.astype(np.float32) / INT16_SCALE
+
+
+class AudioData(NamedTuple):
+    """Audio used inside the application.
+
+    The data is either int16 or float32 with the shape (samples,) or (samples, channels).
+    Float samples are in the range [-1, 1], int16 samples use the full range. Because this is
+    a tuple of (sample_rate, data) it can be passed directly to gr.Audio(type="numpy").
+    """
+
+    sample_rate: int
+    data: np.ndarray
+
+    @classmethod
+    def from_array(cls, sample_rate: int, data: np.ndarray) -> "AudioData":
+        """Create audio data from an array of any dtype.
+
+        int16 and float32 are kept, other float types are converted to float32 and other
+        integer types are scaled to int16.
+        """
+        data = np.asarray(data)
+
+        if data.dtype == np.int16 or data.dtype == np.float32:
+            return cls(sample_rate, data)
+
+        if np.issubdtype(data.dtype, np.floating):
+            return cls(sample_rate, data.astype(np.float32))
+
+        if np.issubdtype(data.dtype, np.integer):
+            scale = np.iinfo(data.dtype).max / INT16_SCALE
+            return cls(sample_rate, (data / scale).astype(np.int16))
+
+        raise ValueError(f"Unsupported audio dtype {data.dtype}")
+
+    @property
+    def duration(self) -> float:
+        return len(self.data) / self.sample_rate
+
+    def to_int16(self) -> "AudioData":
+        if self.data.dtype == np.int16:
+            return self
+
+        return AudioData(self.sample_rate, float_to_int16(self.data))
+
+    def to_float32(self) -> "AudioData":
+        if self.data.dtype == np.float32:
+            return self
+
+        return AudioData(self.sample_rate, int16_to_float32(self.data))
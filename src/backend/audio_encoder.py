@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+
+from pydub import AudioSegment
+
+from backend.audio_data import AudioData
+from backend.time_stretch import time_stretch
+
+logger = logging.getLogger(__name__)
+
+encoded_path = (
+    Path(__file__).parents[0]
+    / Path("..")
+    / Path("..")
+    / Path("cache")
+    / Path("encoded")
+)
+
+# Container format for pydub, codec and bitrate
+AUDIO_FORMATS = {
+    "mp3": ("mp3", None, "64k"),
+    "opus": ("ogg", "libopus", "32k"),
+}
+
+AUDIO_FORMAT = os.getenv("LLA_AGENT_AUDIO_FORMAT", "mp3")
+MAX_ENCODED_FILES = int(os.getenv("LLA_AGENT_ENCODED_AUDIO_MAX_FILES", 200))
+
+_lock = threading.Lock()
+
+
+def _prune():
+    files = sorted(
+        (file for file in encoded_path.iterdir() if file.suffix != ".tmp"),
+        key=lambda file: file.stat().st_mtime,
+    )
+    for file in files[: max(0, len(files) - MAX_ENCODED_FILES)]:
+        file.unlink(missing_ok=True)
+
+
+def encode_audio(
+    audio_data: AudioData, audio_format: str = AUDIO_FORMAT, speed: float = 1.0
+) -> Path:
+    """Encode audio into a compressed file.
+
+    Every clip is only encoded once, the file is addressed by the hash of its content and
+    reused on later calls. Speed variants are stretched from the clip and stored next to it
+    under the same hash. Only the MAX_ENCODED_FILES most recently used files are kept.
+
+    Args:
+        audio_data (AudioData): The audio.
+        audio_format (str, optional): Either "mp3" or "opus". Defaults to AUDIO_FORMAT.
+        speed (float, optional): The playback speed of the variant. Defaults to 1.0.
+
+    Returns:
+        Path: The path of the encoded file.
+    """
+    container, codec, bitrate = AUDIO_FORMATS[audio_format]
+    sr, data = audio_data.to_int16()
+
+    digest = hashlib.sha256(str(sr).encode())
+    digest.update(data.tobytes())
+    name = digest.hexdigest() if speed == 1.0 else f"{digest.hexdigest()}_{speed}x"
+    file = encoded_path / f"{name}.{container}"
+
+    if file.exists():
+        os.utime(file)
+        return file
+
+    if speed != 1.0:
+        sr, data = time_stretch(AudioData(sr, data), speed)
+
+    encoded_path.mkdir(parents=True, exist_ok=True)
+    tmp_file = file.with_suffix(f".{threading.get_ident()}.tmp")
+
+    AudioSegment(
+        data=data.tobytes(),
+        sample_width=2,
+        frame_rate=sr,
+        channels=data.shape[1] if data.ndim > 1 else 1,
+    ).export(tmp_file, format=container, codec=codec, bitrate=bitrate)
+
+    os.replace(tmp_file, file)
+
+    logger.info(
+        f"Encoded {audio_data.duration:.1f}s of audio to {file.stat().st_size / 1024:.0f} KiB {audio_format}"
+    )
+
+    with _lock:
+        _prune()
+
+    return file
@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+import httpx
+from pydub import AudioSegment
+
+from backend.voice_library import get_file_hash
+
+if TYPE_CHECKING:
+    from fish_audio_sdk import ReferenceAudio
+
+logger = logging.getLogger(__name__)
+
+encoded_references_path = (
+    Path(__file__).parents[0]
+    / Path("..")
+    / Path("..")
+    / Path("cache")
+    / Path("fish_audio")
+)
+
+REFERENCE_ID_PREFIX = "lla-"
+# The references are compressed with a high bitrate so that the voice cloning is not affected
+REFERENCE_BITRATE = "192k"
+# Seconds after which the list of registered references is requested again, so that
+# references which the server lost are registered again
+REFERENCE_LIST_TTL = 300.0
+# Seconds in which the references are sent with every request after the server failed
+REFERENCE_RETRY_INTERVAL = 300.0
+
+
+class FishAudioReferences:
+    """Reference voices of the local Fish Speech server.
+
+    Every reference voice is registered once on the server and afterwards only addressed by
+    its id, which is derived from the content of the reference file. Servers without the
+    reference endpoints receive the reference with every request. For these a compressed
+    version of every reference is cached on disk and in memory. If the endpoints fail, the
+    references are sent with every request for REFERENCE_RETRY_INTERVAL seconds.
+    """
+
+    def __init__(self, base_url: str, path: Path = encoded_references_path):
+        self.base_url = base_url
+        self.path = path
+
+        self._lock = threading.Lock()
+        # None until the server was asked which references it knows
+        self._registered: set[str] | None = None
+        self._registered_time = 0.0
+        self._supported = True
+        # The references are not registered until this time after a failure
+        self._retry_time = 0.0
+        self._references: dict[str, "ReferenceAudio"] = dict()
+
+    def _get_id(self, audio_file: Path) -> str:
+        return REFERENCE_ID_PREFIX + get_file_hash(Path(audio_file))[:32]
+
+    def _load_registered(self):
+        response = httpx.get(f"{self.base_url}/v1/references/list")
+        response.raise_for_status()
+        self._registered = set(response.json().get("reference_ids", []))
+        self._registered_time = time.monotonic()
+
+    def _register(self, reference_id: str, voice: dict):
+        with open(voice["audio_file"], "rb") as f:
+            audio = f.read()
+
+        response = httpx.post(
+            f"{self.base_url}/v1/references/add",
+            data={"id": reference_id, "text": voice["text"]},
+            files={"audio": (Path(voice["audio_file"]).name, audio, "audio/wav")},
+            timeout=60,
+        )
+        response.raise_for_status()
+
+        self._registered.add(reference_id)
+        logger.info(f"Registered {voice['audio_file']} as {reference_id}")
+
+    def _retry_later(self, error: Exception):
+        logger.warning(
+            f"Could not register the reference, sending it with the requests for {REFERENCE_RETRY_INTERVAL:.0f}s: {error}"
+        )
+        self._retry_time = time.monotonic() + REFERENCE_RETRY_INTERVAL
+
+    def invalidate(self):
+        """Request the registered references again before the next use, e.g. after a request
+        with a reference id failed."""
+        with self._lock:
+            self._registered = None
+
+    def get_reference_id(self, voice: dict) -> str | None:
+        """Get the id of a voice on the server, the voice is registered on first use.
+
+        Args:
+            voice (dict): The voice with its audio_file and text.
+
+        Returns:
+            str | None: The reference id, None if the server does not support references.
+        """
+        with self._lock:
+            if not self._supported or time.monotonic() < self._retry_time:
+                return None
+
+            reference_id = self._get_id(voice["audio_file"])
+
+            try:
+                if (
+                    self._registered is None
+                    or time.monotonic() - self._registered_time > REFERENCE_LIST_TTL
+                ):
+                    self._load_registered()
+
+                if reference_id not in self._registered:
+                    self._register(reference_id, voice)
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code in (404, 405):
+                    logger.warning(
+                        "Fish Audio server does not support references, sending them with every request"
+                    )
+                    self._supported = False
+                else:
+                    self._retry_later(e)
+                return None
+            except (httpx.HTTPError, ValueError) as e:
+                self._retry_later(e)
+                return None
+
+            return reference_id
+
+    def get_reference_audio(self, voice: dict) -> "ReferenceAudio":
+        """Get a voice which is sent with the request. The compressed audio is cached.
+
+        Args:
+            voice (dict): The voice with its audio_file and text.
+
+        Returns:
+            ReferenceAudio: The reference.
+        """
+        from fish_audio_sdk import ReferenceAudio
+
+        with self._lock:
+            reference_id = self._get_id(voice["audio_file"])
+
+            reference = self._references.get(reference_id)
+            if reference is not None:
+                return reference
+
+            file = self.path / f"{reference_id}.mp3"
+
+            if not file.exists():
+                self.path.mkdir(parents=True, exist_ok=True)
+                tmp_file = file.with_suffix(".tmp")
+                AudioSegment.from_file(voice["audio_file"]).export(
+                    tmp_file, format="mp3", bitrate=REFERENCE_BITRATE
+                )
+                tmp_file.replace(file)
+
+            with open(file, "rb") as f:
+                reference = ReferenceAudio(audio=f.read(), text=voice["text"])
+
+            self._references[reference_id] = reference
+
+            return reference
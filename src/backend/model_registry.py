@@ -0,0 +1,270 @@
+import gc
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Generator, NamedTuple
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+# RAM which the loaded models may use, by default half of the physical memory
+MODEL_MEMORY_BUDGET = (
+    int(
+        os.getenv(
+            "LLA_AGENT_MODEL_MEMORY_BUDGET_MB",
+            psutil.virtual_memory().total // 2 // 2**20,
+        )
+    )
+    * 2**20
+)
+
+
+class ModelKey(NamedTuple):
+    name: str
+    device: str
+    compute_type: str
+
+
+class _Entry:
+    def __init__(
+        self,
+        model: Any,
+        unload: Callable[[], None] | None,
+        resident_bytes: int,
+        load_time: float,
+    ):
+        self.model = model
+        self.unload = unload
+        self.resident_bytes = resident_bytes
+        self.load_time = load_time
+        self.leases = 0
+        self.last_used = time.monotonic()
+
+
+def get_torch_device() -> str:
+    """Get the best available torch device."""
+    import torch
+
+    if torch.cuda.is_available():
+        return "cuda"
+
+    if torch.backends.mps.is_available():
+        return "mps"
+
+    return "cpu"
+
+
+def _get_resident_set() -> int:
+    """Get the resident set of the process and its children. Some models, e.g. the recorder
+    of RealtimeSTT, are loaded in child processes."""
+    process = psutil.Process()
+    resident_set = process.memory_info().rss
+
+    for child in process.children(recursive=True):
+        try:
+            resident_set += child.memory_info().rss
+        except psutil.Error:
+            pass
+
+    return resident_set
+
+
+def _free_memory():
+    gc.collect()
+
+    # Only use torch if it was already imported by a model
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+
+class ModelRegistry:
+    """Shared instances of the local models, keyed by the model, device and compute type.
+
+    A model is loaded on its first lease and shared by all later leases. The resident set of
+    a model is measured while it is loaded. If the loaded models exceed the memory budget,
+    the least recently used models which are not leased are unloaded.
+    """
+
+    def __init__(self, budget: int = MODEL_MEMORY_BUDGET):
+        self.budget = budget
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        # Loads are serialized, so that the resident set of every model can be measured
+        self._load_lock = threading.Lock()
+        # Ordered from the least to the most recently used model
+        self._entries: OrderedDict[ModelKey, _Entry] = OrderedDict()
+
+    def _lease(self, key: ModelKey) -> Any | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            entry.leases += 1
+            entry.last_used = time.monotonic()
+            self._entries.move_to_end(key)
+
+            return entry.model
+
+    def _select_evictions(self) -> list[tuple[ModelKey, _Entry]]:
+        """Remove idle models until the budget is met. Must be called with the lock."""
+        resident_bytes = sum(entry.resident_bytes for entry in self._entries.values())
+
+        evicted = []
+        for key, entry in list(self._entries.items()):
+            if resident_bytes <= self.budget:
+                break
+
+            if entry.leases == 0:
+                del self._entries[key]
+                resident_bytes -= entry.resident_bytes
+                evicted.append((key, entry))
+                self.evictions += 1
+
+        return evicted
+
+    def _unload(self, evicted: list[tuple[ModelKey, _Entry]]):
+        for key, entry in evicted:
+            if entry.unload is not None:
+                entry.unload()
+
+            logger.info(
+                f"Unloaded {key.name} ({key.device}, {key.compute_type}) which used {entry.resident_bytes / 2**20:.0f} MiB"
+            )
+
+        if len(evicted) > 0:
+            _free_memory()
+
+    def acquire(
+        self,
+        key: ModelKey,
+        loader: Callable[[], Any],
+        unload: Callable[[], None] | None = None,
+    ) -> Any:
+        """Lease a model, it is loaded if it is not loaded yet. A leased model is not unloaded
+        until it is released.
+
+        Args:
+            key (ModelKey): The model, device and compute type.
+            loader (Callable[[], Any]): Loads the model.
+            unload (Callable[[], None] | None, optional): Called when the model is unloaded,
+                e.g. to drop other references to it. Defaults to None.
+
+        Returns:
+            Any: The shared model.
+        """
+        model = self._lease(key)
+        if model is not None:
+            return model
+
+        with self._load_lock:
+            # The model could have been loaded while waiting for the lock
+            model = self._lease(key)
+            if model is not None:
+                return model
+
+            resident_set = _get_resident_set()
+            start = time.perf_counter()
+
+            model = loader()
+
+            entry = _Entry(
+                model,
+                unload,
+                max(0, _get_resident_set() - resident_set),
+                time.perf_counter() - start,
+            )
+            entry.leases = 1
+
+            with self._lock:
+                self._entries[key] = entry
+                evicted = self._select_evictions()
+
+            logger.info(
+                f"Loaded {key.name} ({key.device}, {key.compute_type}) in {entry.load_time:.2f}s, it uses {entry.resident_bytes / 2**20:.0f} MiB"
+            )
+
+            self._unload(evicted)
+
+        return model
+
+    def release(self, key: ModelKey):
+        """End a lease of a model. Idle models are unloaded if the budget is exceeded."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return
+
+            entry.leases -= 1
+            entry.last_used = time.monotonic()
+            evicted = self._select_evictions()
+
+        self._unload(evicted)
+
+    def unload(self, key: ModelKey) -> bool:
+        """Unload a model which is not leased, independent of the budget. Used for models
+        which are only needed once.
+
+        Returns:
+            bool: True if the model was unloaded.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.leases > 0:
+                return False
+
+            del self._entries[key]
+
+        self._unload([(key, entry)])
+
+        return True
+
+    @contextmanager
+    def use(
+        self,
+        key: ModelKey,
+        loader: Callable[[], Any],
+        unload: Callable[[], None] | None = None,
+    ) -> Generator[Any, None, None]:
+        """Lease a model for the duration of the context. See acquire."""
+        model = self.acquire(key, loader, unload)
+        try:
+            yield model
+        finally:
+            self.release(key)
+
+    def stats(self) -> dict:
+        """Get the budget, the number of evictions and the resident set, leases, load time and
+        idle time of every loaded model."""
+        now = time.monotonic()
+
+        with self._lock:
+            models = [
+                {
+                    "name": key.name,
+                    "device": key.device,
+                    "compute_type": key.compute_type,
+                    "resident_bytes": entry.resident_bytes,
+                    "leases": entry.leases,
+                    "load_time": entry.load_time,
+                    "idle_time": now - entry.last_used if entry.leases == 0 else 0.0,
+                }
+                for key, entry in self._entries.items()
+            ]
+
+        return {
+            "budget_bytes": self.budget,
+            "resident_bytes": sum(model["resident_bytes"] for model in models),
+            "evictions": self.evictions,
+            "models": models,
+        }
+
+
+model_registry = ModelRegistry()
@@ -0,0 +1,127 @@
+import struct
+from typing import Generator
+
+import numpy as np
+
+from backend.audio_data import AudioData
+
+
+class PCMStreamDecoder:
+    """Decodes a stream of 16 bit PCM bytes into numpy chunks.
+
+    Bytes which do not form a complete frame are kept until the next call of feed, so the
+    stream can be split at any byte boundary. If wav_header is set the stream is expected to
+    start with a WAV header from which the sample rate and number of channels are read.
+    """
+
+    SAMPLE_WIDTH = 2
+
+    def __init__(
+        self,
+        sample_rate: int | None = None,
+        channels: int = 1,
+        wav_header: bool = False,
+        min_chunk_bytes: int = 9600,
+    ):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.min_chunk_bytes = min_chunk_bytes
+
+        self._buffer = bytearray()
+        self._header_done = not wav_header
+
+    def _parse_wav_header(self) -> bool:
+        """Parse the WAV header from the buffer.
+
+        Returns:
+            bool: True if the header is complete and was removed from the buffer.
+        """
+        if len(self._buffer) < 12:
+            return False
+
+        if self._buffer[0:4] != b"RIFF" or self._buffer[8:12] != b"WAVE":
+            raise ValueError("The audio stream does not start with a WAV header")
+
+        position = 12
+        while position + 8 <= len(self._buffer):
+            chunk_id = bytes(self._buffer[position : position + 4])
+            (chunk_size,) = struct.unpack_from("<I", self._buffer, position + 4)
+
+            if chunk_id == b"data":
+                # The size of the data chunk is unknown while streaming, everything
+                # following the chunk header is audio data
+                del self._buffer[: position + 8]
+                return True
+
+            # Chunks are padded to an even size
+            chunk_end = position + 8 + chunk_size + (chunk_size % 2)
+            if chunk_end > len(self._buffer):
+                return False
+
+            if chunk_id == b"fmt ":
+                audio_format, channels, sample_rate = struct.unpack_from(
+                    "<HHI", self._buffer, position + 8
+                )
+                (bits_per_sample,) = struct.unpack_from(
+                    "<H", self._buffer, position + 22
+                )
+
+                if audio_format != 1 or bits_per_sample != 16:
+                    raise ValueError(
+                        f"Unsupported WAV format {audio_format} with {bits_per_sample} bits"
+                    )
+
+                self.channels = channels
+                self.sample_rate = sample_rate
+
+            position = chunk_end
+
+        return False
+
+    def _take(self, min_bytes: int) -> AudioData | None:
+        frame_size = self.SAMPLE_WIDTH * self.channels
+        available = len(self._buffer) - len(self._buffer) % frame_size
+
+        if available == 0 or available < min_bytes:
+            return None
+
+        audio = np.frombuffer(bytes(self._buffer[:available]), dtype=np.int16)
+        del self._buffer[:available]
+
+        if self.channels > 1:
+            audio = audio.reshape(-1, self.channels)
+
+        return AudioData(self.sample_rate, audio)
+
+    def feed(self, data: bytes) -> Generator[AudioData, None, None]:
+        """Add bytes to the stream.
+
+        Args:
+            data (bytes): The next bytes of the stream.
+
+        Yields:
+            AudioData: The audio once enough bytes arrived.
+        """
+        self._buffer.extend(data)
+
+        if not self._header_done:
+            self._header_done = self._parse_wav_header()
+            if not self._header_done:
+                return
+
+        chunk = self._take(self.min_chunk_bytes)
+        if chunk is not None:
+            yield chunk
+
+    def flush(self) -> Generator[AudioData, None, None]:
+        """Get the remaining audio data at the end of the stream.
+
+        Yields:
+            AudioData: The remaining audio.
+        """
+        if not self._header_done:
+            return
+
+        chunk = self._take(0)
+        if chunk is not None:
+            yield chunk
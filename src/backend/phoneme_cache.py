@@ -0,0 +1,156 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable
+
+from backend.audio_cache import normalize_text
+
+logger = logging.getLogger(__name__)
+
+phoneme_cache_path = (
+    Path(__file__).parents[0]
+    / Path("..")
+    / Path("..")
+    / Path("cache")
+    / Path("phonemes.sqlite3")
+)
+
+DEFAULT_MAX_ENTRIES = 20000
+
+
+class PhonemeCache:
+    """Cache for the grapheme to phoneme conversion of the local TTS engines.
+
+    The phonemes are kept in memory with a least recently used limit. If a path is given,
+    they are additionally stored in a SQLite database so that they survive a restart.
+    Entries are keyed by the language and the normalized text.
+    """
+
+    def __init__(
+        self, path: Path | None = None, max_entries: int = DEFAULT_MAX_ENTRIES
+    ):
+        self.path = path
+        self.max_entries = max_entries
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.g2p_time = 0.0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], str] = OrderedDict()
+        self._connection: sqlite3.Connection | None = None
+
+    def _get_connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS phonemes "
+                "(language TEXT, text TEXT, phonemes TEXT, PRIMARY KEY (language, text))"
+            )
+
+        return self._connection
+
+    def _remember(self, key: tuple[str, str], phonemes: str):
+        self._entries[key] = phonemes
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _get(self, key: tuple[str, str]) -> str | None:
+        phonemes = self._entries.get(key)
+        if phonemes is not None:
+            self._entries.move_to_end(key)
+            self.memory_hits += 1
+            return phonemes
+
+        if self.path is None:
+            return None
+
+        row = (
+            self._get_connection()
+            .execute(
+                "SELECT phonemes FROM phonemes WHERE language = ? AND text = ?", key
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+
+        self.disk_hits += 1
+        self._remember(key, row[0])
+
+        return row[0]
+
+    def get_phonemes(self, language: str, text: str, g2p: Callable[[str], str]) -> str:
+        """Get the phonemes of a text, they are only computed if they are not cached.
+
+        Args:
+            language (str): The language of the text, e.g. the kokoro language code.
+            text (str): The text.
+            g2p (Callable[[str], str]): Converts the text to phonemes.
+
+        Returns:
+            str: The phonemes.
+        """
+        key = (language, normalize_text(text))
+
+        with self._lock:
+            phonemes = self._get(key)
+            if phonemes is not None:
+                return phonemes
+
+        start = time.perf_counter()
+        phonemes = g2p(text)
+        g2p_time = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.g2p_time += g2p_time
+            self._remember(key, phonemes)
+
+            if self.path is not None:
+                connection = self._get_connection()
+                connection.execute(
+                    "INSERT OR REPLACE INTO phonemes VALUES (?, ?, ?)",
+                    key + (phonemes,),
+                )
+                connection.commit()
+
+        return phonemes
+
+    def stats(self) -> dict:
+        """Get the hit counters of the cache.
+
+        Returns:
+            dict: The memory and disk hits, the misses, the hit rate, the time spent on the
+                conversion and the estimated time which was saved by the hits.
+        """
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            average_g2p_time = self.g2p_time / self.misses if self.misses > 0 else 0.0
+
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total > 0 else 0.0,
+                "entries": len(self._entries),
+                "g2p_time": self.g2p_time,
+                "saved_time": average_g2p_time * hits,
+            }
+
+
+phoneme_cache = PhonemeCache(
+    phoneme_cache_path
+    if os.getenv("LLA_AGENT_PHONEME_CACHE_DISK", "0") == "1"
+    else None,
+    int(os.getenv("LLA_AGENT_PHONEME_CACHE_ENTRIES", DEFAULT_MAX_ENTRIES)),
+)
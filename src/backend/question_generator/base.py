@@ -344,6 +344,7 @@ class QuestionGenerator:
                         QGT.READING_COMPREHENSION_QUESTION
                     ),
                     QGT.AUDIO_DATA: await ctx.store.get(QGT.AUDIO_DATA, None),
+                    QGT.AUDIO_TIMINGS: await ctx.store.get(QGT.AUDIO_TIMINGS, None),
                 }
 
             case question_generator.LISTENING_COMPREHENSION:
@@ -361,11 +362,38 @@ class QuestionGenerator:
                         QGT.LISTENING_COMPREHENSION_QUESTION
                     ),
                     QGT.AUDIO_DATA: await ctx.store.get(QGT.AUDIO_DATA, None),
+                    QGT.AUDIO_TIMINGS: await ctx.store.get(QGT.AUDIO_TIMINGS, None),
+                    QGT.AUDIO_SEGMENTS: await ctx.store.get(QGT.AUDIO_SEGMENTS, None),
                 }
 
             case _:
                 raise ValueError(f"{key}: Unknown key value")
 
+    async def _handle_audio_segments(
+        self, output: dict, extra_parameters: dict | None, stream: bool
+    ):
+        """Render the audio segments of a question.
+        Questions which are shown directly get an audio stream, questions which are buffered
+        are rendered completely.
+        """
+        if output.get(QGT.AUDIO_SEGMENTS) is None or output.get(QGT.AUDIO_DATA):
+            return
+
+        tts_provider = extra_parameters["tts_provider"]
+        language = extra_parameters["language"]
+
+        if stream:
+            output[QGT.AUDIO_STREAM] = QGT.stream_audio_data(
+                tts_provider, language, output
+            )
+        else:
+            (
+                output[QGT.AUDIO_DATA],
+                output[QGT.AUDIO_TIMINGS],
+            ) = await QGT.render_audio_segments(
+                tts_provider, language, output[QGT.AUDIO_SEGMENTS]
+            )
+
     async def _generate_question(
         self,
         key: str,
@@ -411,6 +439,10 @@ class QuestionGenerator:
 
             output = await self._handle_agent_result(ctx, key)
 
+            await self._handle_audio_segments(
+                output, extra_parameters, stream=not yielded_result
+            )
+
             if not yielded_result:
                 yield output
                 yielded_result = True
@@ -1,11 +1,19 @@
 import logging
 import random
+import time
+from typing import AsyncGenerator, NamedTuple
 
 import numpy as np
 from llama_index.core.workflow import Context
 
 import backend.question_generator as question_generator
-from backend.audio import generate_audio, get_random_voice_id_for_provider
+from backend.audio import (
+    generate_audio_segments,
+    get_random_voice_id_for_provider,
+    stream_audio_segments,
+)
+from backend.audio_assembler import AudioAssembler
+from backend.audio_data import AudioData
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +34,23 @@ LISTENING_COMPREHENSION_TEXT = "listening_comprehension_text"
 LISTENING_COMPREHENSION_QUESTION = "listening_comprehension_question"
 
 AUDIO_DATA = "audio_data"
+# List of (text, voice_id, silence after the segment in seconds)
+AUDIO_SEGMENTS = "audio_segments"
+AUDIO_STREAM = "audio_stream"
+# List of SegmentTiming, the position of every segment in the AUDIO_DATA
+AUDIO_TIMINGS = "audio_timings"
+
+
+class SegmentTiming(NamedTuple):
+    """Position of an audio segment in the assembled audio. The silence after the segment is
+    not included."""
+
+    segment: int
+    # Voice id of the speaker
+    speaker: int
+    start_sample: int
+    end_sample: int
+
 
 _CREATE_QUESTION_BASE_TEXT_INSTRUCTION = """
 You have started the question generation with this text:
@@ -48,6 +73,117 @@ You have started the generation with this text:
 """
 
 
+def _get_segment_timings(
+    assembler: AudioAssembler,
+    segments: list[tuple[str, int, float]],
+    markers: list[tuple[int, int]],
+) -> list[SegmentTiming]:
+    """Resolve the markers of the segments after the assembler was built."""
+    return [
+        SegmentTiming(
+            i,
+            voice_id,
+            assembler.sample_position(start),
+            assembler.sample_position(end),
+        )
+        for i, ((_, voice_id, _), (start, end)) in enumerate(zip(segments, markers))
+    ]
+
+
+async def render_audio_segments(
+    tts_provider: str, language: str, segments: list[tuple[str, int, float]]
+) -> tuple[AudioData | None, list[SegmentTiming]]:
+    """Render the complete audio of the segments created by finish.
+
+    Args:
+        tts_provider (str): The TTS provider.
+        language (str): The language of the texts.
+        segments (list[tuple[str, int, float]]): The text, voice id and the silence after each segment.
+
+    Returns:
+        tuple[AudioData | None, list[SegmentTiming]]: The rendered audio and the position of
+            every segment in it.
+    """
+    rendered_segments = await generate_audio_segments(
+        tts_provider, language, [(text, voice_id) for text, voice_id, _ in segments]
+    )
+
+    assembler = AudioAssembler(dtype=np.int16)
+    markers = []
+    for rendered_segment, (_, _, silence) in zip(rendered_segments, segments):
+        start = assembler.mark()
+        for sr, audio_np in rendered_segment:
+            assembler.add_segment(sr, audio_np)
+        markers.append((start, assembler.mark()))
+        assembler.add_silence(silence)
+
+    audio_data = assembler.build()
+    if audio_data is None:
+        return None, []
+
+    return audio_data, _get_segment_timings(assembler, segments, markers)
+
+
+async def stream_audio_data(
+    tts_provider: str,
+    language: str,
+    question_data: dict,
+) -> AsyncGenerator[AudioData, None]:
+    """Stream the audio of the segments created by finish in order as soon as each segment is
+    ready. Once the stream is complete the assembled audio is stored as AUDIO_DATA and the
+    position of every segment as AUDIO_TIMINGS of the question data.
+
+    Args:
+        tts_provider (str): The TTS provider.
+        language (str): The language of the texts.
+        question_data (dict): The question data containing the AUDIO_SEGMENTS.
+
+    Yields:
+        AudioData: The next chunk.
+    """
+    segments = question_data[AUDIO_SEGMENTS]
+
+    assembler = AudioAssembler(dtype=np.int16)
+    markers = []
+    start = time.perf_counter()
+
+    rendered_segments = stream_audio_segments(
+        tts_provider, language, [(text, voice_id) for text, voice_id, _ in segments]
+    )
+
+    i = 0
+    async for rendered_segment in rendered_segments:
+        segment_start = assembler.mark()
+        for audio_data in rendered_segment:
+            if assembler.sample_rate is None:
+                logger.info(
+                    f"Time to first audio chunk: {time.perf_counter() - start:.2f}s"
+                )
+
+            audio_data = audio_data.to_int16()
+            assembler.add_segment(*audio_data)
+            yield audio_data
+
+        markers.append((segment_start, assembler.mark()))
+        silence = segments[i][2]
+        i += 1
+
+        if silence > 0 and assembler.sample_rate is not None:
+            assembler.add_silence(silence)
+            yield AudioData(
+                assembler.sample_rate,
+                np.zeros(int(silence * assembler.sample_rate), dtype=np.int16),
+            )
+
+    audio_data = assembler.build()
+    question_data[AUDIO_DATA] = audio_data
+    question_data[AUDIO_TIMINGS] = (
+        _get_segment_timings(assembler, segments, markers)
+        if audio_data is not None
+        else []
+    )
+
+
 async def finish(context: Context) -> str:
     """This function is used to finish the current process or operation.
     This must be called at the end of every process.
@@ -77,7 +213,6 @@ async def finish(context: Context) -> str:
             mode_switch = extra_parameters["mode_switch"]
 
             if mode_switch:
-                complete_audio = np.array([])
                 tts_provider = extra_parameters["tts_provider"]
                 language = extra_parameters["language"]
 
@@ -88,26 +223,17 @@ async def finish(context: Context) -> str:
                     tts_provider, language, exclude_ids=[general_speaker]
                 )
 
-                for sr, audio_np in generate_audio(
-                    tts_provider, topic, language, general_speaker
-                ):
-                    complete_audio = np.concatenate((complete_audio, audio_np))
-
-                complete_audio = np.concatenate((complete_audio, np.zeros(2 * sr)))
-
-                for sr, audio_np in generate_audio(
-                    tts_provider, text, language, text_speaker
-                ):
-                    complete_audio = np.concatenate((complete_audio, audio_np))
-
-                complete_audio = np.concatenate((complete_audio, np.zeros(2 * sr)))
+                segments = [
+                    (topic, general_speaker, 2),
+                    (text, text_speaker, 2),
+                    (question, general_speaker, 0),
+                ]
 
-                for sr, audio_np in generate_audio(
-                    tts_provider, question, language, general_speaker
-                ):
-                    complete_audio = np.concatenate((complete_audio, audio_np))
-
-                await context.store.set(AUDIO_DATA, (sr, complete_audio))
+                audio_data, timings = await render_audio_segments(
+                    tts_provider, language, segments
+                )
+                await context.store.set(AUDIO_DATA, audio_data)
+                await context.store.set(AUDIO_TIMINGS, timings)
 
         case question_generator.LISTENING_COMPREHENSION:
             topic = await context.store.get(LISTENING_COMPREHENSION_TOPIC, None)
@@ -129,7 +255,6 @@ async def finish(context: Context) -> str:
             mode_switch = extra_parameters["mode_switch"]
 
             if mode_switch:
-                complete_audio = np.array([])
                 tts_provider = extra_parameters["tts_provider"]
                 language = extra_parameters["language"]
 
@@ -148,39 +273,18 @@ async def finish(context: Context) -> str:
 
                 text_voices = [first_speaker_voice_id, second_speaker_voice_id]
 
-                # Topic audio
-                for sr, audio_np in generate_audio(
-                    tts_provider, topic, language, third_speaker_voice_id
-                ):
-                    complete_audio = np.concatenate((complete_audio, audio_np))
-
-                complete_audio = np.concatenate((complete_audio, np.zeros(2 * sr)))
-
-                i = 0
-
-                for text_segment in text:
-                    audio_text = text_segment["text"]
-
-                    for sr, audio_np in generate_audio(
-                        tts_provider,
-                        audio_text,
-                        language,
-                        voice_id=text_voices[i % 2],
-                    ):
-                        complete_audio = np.concatenate((complete_audio, audio_np))
-                    i += 1
-                    # Add silence between segments
-                    complete_audio = np.concatenate((complete_audio, np.zeros(sr)))
-
-                complete_audio = np.concatenate((complete_audio, np.zeros(2 * sr)))
-
-                # Question audio
-                for sr, audio_np in generate_audio(
-                    tts_provider, question, language, third_speaker_voice_id
-                ):
-                    complete_audio = np.concatenate((complete_audio, audio_np))
+                # The audio is rendered by the question generator so that it can be
+                # streamed to the user while the later segments are still rendering
+                segments = [(topic, third_speaker_voice_id, 2)]
+                segments.extend(
+                    (text_segment["text"], text_voices[i % 2], 1)
+                    for i, text_segment in enumerate(text)
+                )
+                # Extend the silence after the last segment
+                segments[-1] = segments[-1][:2] + (segments[-1][2] + 2,)
+                segments.append((question, third_speaker_voice_id, 0))
 
-                await context.store.set(AUDIO_DATA, (sr, complete_audio))
+                await context.store.set(AUDIO_SEGMENTS, segments)
 
     return "The process was finished."
 
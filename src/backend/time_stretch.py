@@ -0,0 +1,44 @@
+import logging
+import time
+
+import numpy as np
+
+from backend.audio_data import AudioData
+
+logger = logging.getLogger(__name__)
+
+# Playback speeds which are offered for the rendered question audio
+SPEED_VARIANTS = [0.75, 1.0, 1.25]
+
+
+def time_stretch(audio_data: AudioData, speed: float) -> AudioData:
+    """Change the speed of audio without changing its pitch.
+
+    Args:
+        audio_data (AudioData): The audio.
+        speed (float): The playback speed, e.g. 0.75 is slower and 1.25 faster.
+
+    Returns:
+        AudioData: The stretched audio with the dtype of the input.
+    """
+    if speed == 1.0:
+        return audio_data
+
+    # librosa is only needed for the speed variants and slow to import
+    import librosa
+
+    start = time.perf_counter()
+
+    sr, data = audio_data.to_float32()
+    # librosa expects the samples in the last axis
+    stretched = librosa.effects.time_stretch(data.T, rate=speed).T
+    stretched = AudioData(sr, np.ascontiguousarray(stretched, dtype=np.float32))
+
+    logger.info(
+        f"Stretched {audio_data.duration:.1f}s of audio to {speed}x in {time.perf_counter() - start:.2f}s"
+    )
+
+    if audio_data.data.dtype == np.int16:
+        return stretched.to_int16()
+
+    return stretched
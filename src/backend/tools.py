@@ -14,6 +14,27 @@ from llama_index.llms.openai import OpenAI
 from llama_index.tools.google import GoogleSearchToolSpec
 from llama_index.tools.tavily_research import TavilyToolSpec
 
+from backend.model_registry import ModelKey, get_torch_device, model_registry
+
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+def _get_embedding_model_key() -> ModelKey:
+    return ModelKey(f"huggingface/{EMBEDDING_MODEL}", get_torch_device(), "float32")
+
+
+async def _acquire_embedding_model(key: ModelKey) -> HuggingFaceEmbedding:
+    """Lease the shared embedding model from the registry, it is only loaded on first use.
+
+    The lease is acquired on a thread, because the registry blocks while any other model is
+    loaded, e.g. during the warmup.
+    """
+    return await asyncio.to_thread(
+        model_registry.acquire,
+        key,
+        lambda: HuggingFaceEmbedding(model_name=EMBEDDING_MODEL, device=key.device),
+    )
+
 
 async def fetch_webpage(
     url: str, session: aiohttp.ClientSession, timeout: int = 10
@@ -76,10 +97,6 @@ async def summarize_website(
     """
     logging.info(f"Called summarize_website for {url} with {query}")
 
-    Settings.embed_model = HuggingFaceEmbedding(
-        model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
-    )
-
     Settings.llm = OpenAI(model="gpt-4o-mini-2024-07-18")
 
     if session is not None:
@@ -92,11 +109,19 @@ async def summarize_website(
         logging.debug(f"Error {url} could not be accessed")
         return f"There was an error with summarizing {url}. The website could not be accessed."
 
-    index = VectorStoreIndex.from_documents(documents)
-
     input_query = f"Summarize in very meticulously detail. {query}"
 
-    return f"Source: {url} \n Content:{index.as_query_engine().query(input_query).response}"
+    # The embedding model is passed to the index instead of the global settings, so that
+    # the registry can unload it when it is not used
+    key = _get_embedding_model_key()
+    embed_model = await _acquire_embedding_model(key)
+    try:
+        index = VectorStoreIndex.from_documents(documents, embed_model=embed_model)
+
+        return f"Source: {url} \n Content:{index.as_query_engine().query(input_query).response}"
+    finally:
+        # Releasing can unload idle models
+        await asyncio.to_thread(model_registry.release, key)
 
 
 async def summarize_websites(urls: list[str], query: str) -> list[str]:
@@ -0,0 +1,310 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from typing import AsyncGenerator, Callable
+
+import numpy as np
+
+from util import const
+
+logger = logging.getLogger(__name__)
+
+# Names of the providers in LLA_AGENT_TTS_FALLBACK
+TTS_PROVIDER_NAMES = {
+    "kokoro": const.TTS_KOKORO,
+    "openai": const.TTS_OPENAI,
+    "elevenlabs": const.TTS_ELEVENLABS,
+    "fish_audio": const.TTS_FISH_AUDIO,
+    "chatterbox": const.TTS_CHATTERBOX,
+}
+
+# Time in seconds until the first chunk of a provider has to arrive. The time a request
+# waits for a free slot of the provider is not included. Only the async API providers have a
+# deadline, the other providers render on executor threads which can not be cancelled. A
+# request which missed its deadline would keep the engine busy and delay the next requests.
+TTS_DEADLINES = {
+    const.TTS_OPENAI: 10.0,
+    const.TTS_ELEVENLABS: 10.0,
+}
+
+# Number of calls which are used for the rolling statistics
+STATS_WINDOW = 50
+# A provider is unhealthy if at least half of the recent calls failed
+UNHEALTHY_ERROR_RATE = 0.5
+UNHEALTHY_MIN_CALLS = 4
+# Seconds after which an unhealthy provider is tried first again for a single request
+UNHEALTHY_PROBE_INTERVAL = 30.0
+
+
+class TTSProviderError(Exception):
+    """Raised if no provider was able to generate the audio."""
+
+
+class ProviderStats:
+    """Rolling latency and error statistics of a TTS provider."""
+
+    def __init__(self, window: int = STATS_WINDOW):
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.failures: deque[bool] = deque(maxlen=window)
+
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        # Time of the last failure or probe, an unhealthy provider is probed again after
+        # UNHEALTHY_PROBE_INTERVAL
+        self.last_probe = 0.0
+
+    def record(self, latency: float | None, error: bool = False, timeout: bool = False):
+        self.calls += 1
+        self.errors += error
+        self.timeouts += timeout
+
+        if error or timeout:
+            self.last_probe = time.monotonic()
+        elif not self.healthy:
+            # A successful call of an unhealthy provider means it has recovered
+            self.failures.clear()
+
+        self.failures.append(error or timeout)
+        if latency is not None:
+            self.latencies.append(latency)
+
+    @property
+    def error_rate(self) -> float:
+        return sum(self.failures) / len(self.failures) if self.failures else 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return (
+            len(self.failures) < UNHEALTHY_MIN_CALLS
+            or self.error_rate < UNHEALTHY_ERROR_RATE
+        )
+
+    def probe(self) -> bool:
+        """Check if an unhealthy provider should be tried again. Only one request is let
+        through per UNHEALTHY_PROBE_INTERVAL."""
+        now = time.monotonic()
+
+        if now - self.last_probe < UNHEALTHY_PROBE_INTERVAL:
+            return False
+
+        self.last_probe = now
+        return True
+
+    def latency_percentile(self, q: float) -> float | None:
+        return float(np.percentile(self.latencies, q)) if self.latencies else None
+
+    def snapshot(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "error_rate": self.error_rate,
+            "healthy": self.healthy,
+            "latency_p50": self.latency_percentile(50),
+            "latency_p95": self.latency_percentile(95),
+        }
+
+
+class TTSRouter:
+    """Routes TTS requests to the requested provider or to a fallback provider.
+
+    Every provider has a limited number of concurrent slots and optionally a deadline for
+    the first chunk of audio. If the provider fails or misses its deadline, the request is retried
+    with the fallback providers, healthy and fast providers first. A requested provider
+    which failed most of its recent calls is tried last, except for one probe request every
+    UNHEALTHY_PROBE_INTERVAL seconds which tries it first again.
+    """
+
+    def __init__(
+        self,
+        fallback_providers: list[str],
+        concurrency_limits: dict[str, int],
+        deadlines: dict[str, float] = TTS_DEADLINES,
+    ):
+        self.fallback_providers = fallback_providers
+        self.deadlines = deadlines
+
+        self._slots = {
+            provider: asyncio.Semaphore(limit)
+            for provider, limit in concurrency_limits.items()
+        }
+
+        self._lock = threading.Lock()
+        self._stats: dict[str, ProviderStats] = dict()
+        # Number of requests per (requested provider, serving provider)
+        self._decisions: Counter[tuple[str, str]] = Counter()
+
+    def _get_stats(self, tts_provider: str) -> ProviderStats:
+        return self._stats.setdefault(tts_provider, ProviderStats())
+
+    def record(
+        self,
+        tts_provider: str,
+        latency: float | None,
+        error: bool = False,
+        timeout: bool = False,
+    ):
+        """Record the outcome of a call to a provider.
+
+        Args:
+            tts_provider (str): The provider.
+            latency (float | None): The time until the first chunk arrived in seconds.
+            error (bool, optional): The call failed. Defaults to False.
+            timeout (bool, optional): The call missed its deadline. Defaults to False.
+        """
+        with self._lock:
+            self._get_stats(tts_provider).record(latency, error, timeout)
+
+    def route(self, tts_provider: str) -> list[str]:
+        """Get the order in which the providers are tried for a request.
+
+        Args:
+            tts_provider (str): The requested provider.
+
+        Returns:
+            list[str]: The providers.
+        """
+        with self._lock:
+
+            def sort_key(provider: str):
+                stats = self._get_stats(provider)
+                latency = stats.latency_percentile(50)
+                # Providers without measurements are tried after the measured ones
+                return (
+                    not stats.healthy,
+                    latency
+                    if latency is not None
+                    else self.deadlines.get(provider, float("inf")),
+                )
+
+            fallbacks = sorted(
+                (p for p in self.fallback_providers if p != tts_provider),
+                key=sort_key,
+            )
+
+            stats = self._get_stats(tts_provider)
+            if stats.healthy or stats.probe():
+                return [tts_provider] + fallbacks
+
+            return fallbacks + [tts_provider]
+
+    async def stream(
+        self, tts_provider: str, start: Callable[[str], AsyncGenerator]
+    ) -> AsyncGenerator:
+        """Stream the audio of a request.
+
+        Once the first chunk of a provider arrived the request is bound to that provider,
+        later errors are raised to the caller. The deadline of a provider only applies if
+        there is another provider to fall back to.
+
+        Args:
+            tts_provider (str): The requested provider.
+            start (Callable[[str], AsyncGenerator]): Creates the audio stream of a provider.
+
+        Raises:
+            TTSProviderError: If every provider failed.
+
+        Yields:
+            The chunks of the audio stream.
+        """
+        providers = self.route(tts_provider)
+        last_error = None
+
+        for i, provider in enumerate(providers):
+            deadline = self.deadlines.get(provider) if i < len(providers) - 1 else None
+
+            async with self._slots[provider]:
+                generator = start(provider)
+                start_time = time.perf_counter()
+
+                try:
+                    first_chunk = await asyncio.wait_for(anext(generator), deadline)
+                except StopAsyncIteration:
+                    first_chunk = None
+                except TimeoutError as e:
+                    logger.warning(f"{provider} missed its deadline of {deadline}s")
+                    last_error = e
+                    self.record(provider, None, timeout=True)
+                    await generator.aclose()
+                    continue
+                except Exception as e:
+                    logger.warning(f"{provider} failed: {e}")
+                    last_error = e
+                    self.record(provider, None, error=True)
+                    await generator.aclose()
+                    continue
+
+                latency = time.perf_counter() - start_time
+
+                with self._lock:
+                    self._decisions[(tts_provider, provider)] += 1
+                if provider != tts_provider:
+                    logger.info(f"Routed request for {tts_provider} to {provider}")
+
+                if first_chunk is None:
+                    self.record(provider, latency)
+                    return
+
+                try:
+                    yield first_chunk
+                    async for chunk in generator:
+                        yield chunk
+                except Exception:
+                    self.record(provider, latency, error=True)
+                    raise
+                finally:
+                    await generator.aclose()
+
+                self.record(provider, latency)
+                return
+
+        raise TTSProviderError(
+            f"No TTS provider could generate audio for {tts_provider}"
+        ) from last_error
+
+    def stats(self) -> dict:
+        """Get the statistics of the providers and the routing decisions.
+
+        Returns:
+            dict: The rolling statistics of every provider and the number of requests per
+                "requested -> served" provider pair.
+        """
+        with self._lock:
+            return {
+                "providers": {
+                    provider: stats.snapshot()
+                    for provider, stats in self._stats.items()
+                },
+                "decisions": {
+                    f"{requested} -> {served}": count
+                    for (requested, served), count in self._decisions.items()
+                },
+            }
+
+
+def get_fallback_providers() -> list[str]:
+    """Read the fallback providers from LLA_AGENT_TTS_FALLBACK, a comma separated list of
+    kokoro, openai, elevenlabs, fish_audio and chatterbox, e.g. "kokoro,openai".
+
+    There is no fallback by default, because a fallback can use a paid API and a different
+    voice than the requested provider.
+    """
+    names = os.getenv("LLA_AGENT_TTS_FALLBACK", "")
+
+    providers = []
+    for name in names.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        if name not in TTS_PROVIDER_NAMES:
+            logger.warning(f"Unknown TTS fallback provider {name}")
+            continue
+
+        providers.append(TTS_PROVIDER_NAMES[name])
+
+    return providers
@@ -0,0 +1,300 @@
+import itertools
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Generator
+
+import numpy as np
+
+from backend.audio_data import AudioData
+from util import const
+
+logger = logging.getLogger(__name__)
+
+# Providers which are rendered by the worker processes if they are enabled
+WORKER_PROVIDERS = [const.TTS_KOKORO, const.TTS_CHATTERBOX]
+# Number of worker processes, 0 renders in the application process
+TTS_WORKERS = int(os.getenv("LLA_AGENT_TTS_WORKERS", 0))
+
+# Messages from the workers to the pool
+_MESSAGE_READY = "ready"
+_MESSAGE_START = "start"
+_MESSAGE_CHUNK = "chunk"
+_MESSAGE_END = "end"
+_MESSAGE_ERROR = "error"
+
+# Interval in seconds in which a waiting consumer checks that the workers are alive
+_ALIVE_CHECK_INTERVAL = 5.0
+
+
+def _release_segments(release_queue, segments: dict[str, shared_memory.SharedMemory]):
+    """Close the shared memory segments which the pool has copied."""
+    while True:
+        try:
+            name = release_queue.get_nowait()
+        except queue.Empty:
+            return
+
+        segment = segments.pop(name, None)
+        if segment is not None:
+            segment.close()
+
+
+def _worker_main(worker_id: int, job_queue, result_queue, release_queue):
+    """Entry point of a worker process. Renders jobs until None is received."""
+    logging.basicConfig(level=logging.INFO)
+
+    from backend import audio
+    from backend.warmup import get_configured_engines
+
+    engines = get_configured_engines()
+    try:
+        if "kokoro" in engines:
+            audio.init_kokoro_pipelines()
+        if "chatterbox" in engines:
+            audio.warmup_chatterbox()
+    except Exception as e:
+        logger.exception(f"Warmup of TTS worker {worker_id} failed: {e}")
+
+    result_queue.put((_MESSAGE_READY, worker_id, None, None))
+
+    # Segments which are still read by the pool, keyed by name. They have to stay open until
+    # the pool copied them, on Windows a segment is removed once the last handle is closed.
+    segments: dict[str, shared_memory.SharedMemory] = dict()
+
+    while True:
+        job = job_queue.get()
+        _release_segments(release_queue, segments)
+
+        if job is None:
+            break
+
+        job_id, tts_provider, text, language, voice_id = job
+        result_queue.put((_MESSAGE_START, worker_id, job_id, None))
+
+        try:
+            for sr, data in audio._generate_audio_engine(
+                tts_provider, text, language, voice_id
+            ):
+                data = np.ascontiguousarray(data)
+
+                segment = shared_memory.SharedMemory(
+                    create=True, size=max(data.nbytes, 1)
+                )
+                np.ndarray(data.shape, data.dtype, buffer=segment.buf)[:] = data
+                segments[segment.name] = segment
+
+                result_queue.put(
+                    (
+                        _MESSAGE_CHUNK,
+                        worker_id,
+                        job_id,
+                        (segment.name, sr, data.dtype.str, data.shape),
+                    )
+                )
+
+                _release_segments(release_queue, segments)
+        except Exception as e:
+            result_queue.put((_MESSAGE_ERROR, worker_id, job_id, repr(e)))
+        else:
+            result_queue.put((_MESSAGE_END, worker_id, job_id, None))
+
+    for segment in segments.values():
+        segment.close()
+
+
+class TTSWorkerPool:
+    """Pool of processes which render the local TTS engines.
+
+    Jobs are distributed over a shared job queue. The rendered audio is returned through
+    shared memory, only the name and layout of every chunk pass through the result queue.
+    """
+
+    def __init__(self, num_workers: int):
+        context = multiprocessing.get_context("spawn")
+
+        self._job_queue = context.Queue()
+        self._result_queue = context.Queue()
+        self._release_queues = [context.Queue() for _ in range(num_workers)]
+
+        self._job_ids = itertools.count()
+        self._jobs: dict[int, queue.Queue] = dict()
+        # Worker which renders a job, known once the worker took the job from the queue
+        self._job_workers: dict[int, int] = dict()
+        self._jobs_lock = threading.Lock()
+
+        self._ready_workers = 0
+        self._ready = threading.Condition()
+
+        self._processes = [
+            context.Process(
+                target=_worker_main,
+                args=(
+                    worker_id,
+                    self._job_queue,
+                    self._result_queue,
+                    self._release_queues[worker_id],
+                ),
+                name=f"tts-worker-{worker_id}",
+                daemon=True,
+            )
+            for worker_id in range(num_workers)
+        ]
+
+        for process in self._processes:
+            process.start()
+
+        threading.Thread(
+            target=self._dispatch_results, name="tts-worker-results", daemon=True
+        ).start()
+
+    def _read_chunk(self, worker_id: int, chunk) -> AudioData:
+        name, sr, dtype, shape = chunk
+
+        segment = shared_memory.SharedMemory(name=name)
+        try:
+            data = np.ndarray(shape, np.dtype(dtype), buffer=segment.buf).copy()
+        finally:
+            segment.close()
+            segment.unlink()
+            self._release_queues[worker_id].put(name)
+
+        return AudioData(sr, data)
+
+    def _dispatch_result(self, message: str, worker_id: int, job_id: int, payload):
+        if message == _MESSAGE_READY:
+            with self._ready:
+                self._ready_workers += 1
+                self._ready.notify_all()
+            return
+
+        with self._jobs_lock:
+            job_results = self._jobs.get(job_id)
+
+            if message == _MESSAGE_START:
+                if job_results is not None:
+                    self._job_workers[job_id] = worker_id
+                return
+
+        # The chunk is copied even if nobody waits for the job anymore, so that the
+        # shared memory is always freed
+        if message == _MESSAGE_CHUNK:
+            payload = self._read_chunk(worker_id, payload)
+
+        if job_results is not None:
+            job_results.put((message, payload))
+
+    def _dispatch_results(self):
+        while True:
+            message, worker_id, job_id, payload = self._result_queue.get()
+
+            try:
+                self._dispatch_result(message, worker_id, job_id, payload)
+            except Exception as e:
+                logger.exception(
+                    f"Dispatching a result of TTS job {job_id} failed: {e}"
+                )
+
+                with self._jobs_lock:
+                    job_results = self._jobs.get(job_id)
+
+                if job_results is not None:
+                    job_results.put((_MESSAGE_ERROR, repr(e)))
+
+    def wait_until_ready(self, timeout: float | None = None) -> bool:
+        """Wait until every worker finished its warmup.
+
+        Returns:
+            bool: True if all workers are ready.
+        """
+        with self._ready:
+            return self._ready.wait_for(
+                lambda: self._ready_workers == len(self._processes), timeout
+            )
+
+    def generate(
+        self, tts_provider: str, text: str, language: str, voice_id: int
+    ) -> Generator[AudioData, None, None]:
+        """Render a text on one of the workers.
+
+        Raises:
+            RuntimeError: If the worker failed, the worker of the job exited or no worker
+                is alive.
+
+        Yields:
+            AudioData: The chunks as soon as the worker rendered them.
+        """
+        job_id = next(self._job_ids)
+        job_results = queue.Queue()
+
+        with self._jobs_lock:
+            self._jobs[job_id] = job_results
+
+        try:
+            self._job_queue.put((job_id, tts_provider, text, language, voice_id))
+
+            while True:
+                try:
+                    message, payload = job_results.get(timeout=_ALIVE_CHECK_INTERVAL)
+                except queue.Empty:
+                    with self._jobs_lock:
+                        worker_id = self._job_workers.get(job_id)
+
+                    if worker_id is not None:
+                        if not self._processes[worker_id].is_alive():
+                            raise RuntimeError(
+                                f"TTS worker {worker_id} exited while rendering"
+                            )
+                    elif not any(process.is_alive() for process in self._processes):
+                        raise RuntimeError("No TTS worker is alive")
+                    continue
+
+                if message == _MESSAGE_END:
+                    return
+
+                if message == _MESSAGE_ERROR:
+                    raise RuntimeError(f"TTS worker failed: {payload}")
+
+                yield payload
+        finally:
+            with self._jobs_lock:
+                del self._jobs[job_id]
+                self._job_workers.pop(job_id, None)
+
+    def stop(self):
+        """Stop the workers after their current job."""
+        for _ in self._processes:
+            self._job_queue.put(None)
+
+
+_tts_worker_pool: TTSWorkerPool | None = None
+
+
+def start_tts_workers(num_workers: int | None = None) -> TTSWorkerPool | None:
+    """Start the worker processes for the local TTS engines.
+
+    Args:
+        num_workers (int | None, optional): Number of worker processes. Defaults to
+            TTS_WORKERS, 0 disables the workers.
+
+    Returns:
+        TTSWorkerPool | None: The pool, None if the workers are disabled.
+    """
+    global _tts_worker_pool
+
+    if num_workers is None:
+        num_workers = TTS_WORKERS
+
+    if num_workers > 0 and _tts_worker_pool is None:
+        _tts_worker_pool = TTSWorkerPool(num_workers)
+        logger.info(f"Started {num_workers} TTS worker processes")
+
+    return _tts_worker_pool
+
+
+def get_tts_worker_pool() -> TTSWorkerPool | None:
+    """Get the worker pool, None if the workers are not started."""
+    return _tts_worker_pool
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+voice_path = (
+    Path(__file__).parents[0] / Path("..") / Path("..") / Path("voice_references")
+)
+
+# (path, mtime, size) -> sha256 of the file
+_file_hashes: dict[tuple[str, float, int], str] = dict()
+_file_hashes_lock = threading.Lock()
+
+
+def get_file_hash(path: Path) -> str:
+    """Get the sha256 of a file. The file is only read again once it changed."""
+    stat = path.stat()
+    key = (str(path), stat.st_mtime, stat.st_size)
+
+    with _file_hashes_lock:
+        if key not in _file_hashes:
+            with open(path, "rb") as f:
+                _file_hashes[key] = hashlib.file_digest(f, "sha256").hexdigest()
+
+        return _file_hashes[key]
+
+
+def _convert_mp3_to_wav(mp3_path: Path) -> Path:
+    """
+    Convert mp3 to wav using pydub
+    """
+    # Imported here so that the worker processes only need to import pydub
+    from pydub import AudioSegment
+
+    wav_path = mp3_path.with_suffix(".wav")
+    if not wav_path.exists():
+        audio = AudioSegment.from_mp3(mp3_path)
+        audio.export(wav_path, format="wav")
+    return wav_path
+
+
+def convert_all_mp3_to_wav():
+    """
+    Convert all mp3 files in the voice_path to wav. The conversions run in a process pool.
+    """
+    files = [
+        file
+        for file in voice_path.glob("*.mp3")
+        if not file.with_suffix(".wav").exists()
+    ]
+
+    if len(files) == 0:
+        return
+
+    with ProcessPoolExecutor(max_workers=min(len(files), os.cpu_count() or 1)) as pool:
+        for wav_path in pool.map(_convert_mp3_to_wav, files):
+            logger.info(f"Converted {wav_path}")
+
+
+class VoiceLibrary:
+    """Index of the reference voices in the voice_path, keyed by language code.
+
+    The index is built once and rebuilt when the modification time of the directory changes.
+    The directory is checked at most every refresh_interval seconds, so lookups do not touch
+    the filesystem.
+    """
+
+    def __init__(self, path: Path = voice_path, refresh_interval: float = 2.0):
+        self.path = path
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._voices: dict[str, list[dict]] = dict()
+        self._mtime: float | None = None
+        self._last_check = 0.0
+
+    def _read_voice(self, json_file: Path) -> tuple[str, dict] | None:
+        audio_file = json_file.with_suffix(".wav")
+
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            language = data["language"]
+            text = data["text"]
+
+            with wave.open(str(audio_file), "rb") as wav_file:
+                sample_rate = wav_file.getframerate()
+                duration = wav_file.getnframes() / sample_rate
+        except (OSError, ValueError, KeyError, TypeError, wave.Error) as e:
+            logger.warning(f"Skipping voice reference {json_file}: {e!r}")
+            return None
+
+        return (
+            language,
+            {
+                "audio_file": audio_file,
+                "text": text,
+                "duration": duration,
+                "sample_rate": sample_rate,
+            },
+        )
+
+    def _build(self):
+        voices: dict[str, list[dict]] = dict()
+
+        for file in sorted(self.path.glob("*.json")):
+            voice = self._read_voice(file)
+            if voice is not None:
+                voices.setdefault(voice[0], []).append(voice[1])
+
+        self._voices = voices
+
+        logger.info(
+            f"Indexed {sum(len(v) for v in voices.values())} voice references for {len(voices)} languages"
+        )
+
+    def _refresh(self):
+        now = time.monotonic()
+        if self._mtime is not None and now - self._last_check < self.refresh_interval:
+            return
+
+        self._last_check = now
+
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            mtime = 0.0
+
+        if mtime != self._mtime:
+            self._build()
+            self._mtime = mtime
+
+    def invalidate(self):
+        """Force a rebuild of the index on the next lookup."""
+        with self._lock:
+            self._mtime = None
+
+    def get(self, language_code: str) -> list[dict]:
+        """Get the voices for a language code.
+
+        Args:
+            language_code (str): The ISO 639-1 language code.
+
+        Returns:
+            list[dict]: The voices with their audio_file, text, duration and sample_rate.
+                The list is shared and must not be modified.
+        """
+        with self._lock:
+            self._refresh()
+            return self._voices.get(language_code, [])
+
+
+voice_library = VoiceLibrary()
@@ -0,0 +1,109 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PENDING = "pending"
+WARMUP_LOADING = "loading"
+WARMUP_READY = "ready"
+WARMUP_FAILED = "failed"
+
+# State and load time of every engine which is warmed up, keyed by the engine name
+_warmup_status: dict[str, dict] = dict()
+_warmup_status_lock = threading.Lock()
+
+
+def get_configured_engines() -> list[str]:
+    """Read the engines which are warmed up from LLA_AGENT_WARMUP, a comma separated list
+    of kokoro, chatterbox and whisper. Defaults to whisper, which was always loaded at
+    startup. The TTS engines are opt-in, otherwise they are loaded on their first use."""
+    names = os.getenv("LLA_AGENT_WARMUP", "whisper")
+    return [name.strip().lower() for name in names.split(",") if name.strip()]
+
+
+def _set_status(engine: str, state: str, load_time: float | None = None):
+    with _warmup_status_lock:
+        _warmup_status[engine] = {"state": state, "load_time": load_time}
+
+
+def _run_warmup(warmup_functions: dict[str, Callable[[], None]]):
+    # The engines are loaded one after another as they usually share the same device
+    for engine, warmup_function in warmup_functions.items():
+        _set_status(engine, WARMUP_LOADING)
+        start = time.perf_counter()
+
+        try:
+            warmup_function()
+        except Exception as e:
+            logger.exception(f"Warmup of {engine} failed: {e}")
+            _set_status(engine, WARMUP_FAILED)
+            continue
+
+        load_time = time.perf_counter() - start
+        _set_status(engine, WARMUP_READY, load_time)
+        logger.info(f"Warmed up {engine} in {load_time:.2f}s")
+
+
+def start_warmup(
+    warmup_functions: dict[str, Callable[[], None]],
+    engines: list[str] | None = None,
+) -> threading.Thread:
+    """Load and warm up the configured engines on a background thread.
+
+    Args:
+        warmup_functions (dict[str, Callable[[], None]]): Function which loads the engine and
+            runs a short inference, keyed by the engine name.
+        engines (list[str] | None, optional): The engines to warm up. Defaults to the engines
+            configured in LLA_AGENT_WARMUP.
+
+    Returns:
+        threading.Thread: The warmup thread.
+    """
+    if engines is None:
+        engines = get_configured_engines()
+
+    selected = dict()
+    for engine in engines:
+        if engine not in warmup_functions:
+            logger.warning(f"Unknown warmup engine {engine}")
+            continue
+
+        selected[engine] = warmup_functions[engine]
+        _set_status(engine, WARMUP_PENDING)
+
+    thread = threading.Thread(
+        target=_run_warmup, args=(selected,), name="warmup", daemon=True
+    )
+    thread.start()
+
+    return thread
+
+
+def get_warmup_status() -> dict[str, dict]:
+    """Get the warmup state of the engines.
+
+    Returns:
+        dict[str, dict]: The state ("pending", "loading", "ready" or "failed") and the load
+            time in seconds of every engine which is warmed up.
+    """
+    with _warmup_status_lock:
+        return {engine: dict(status) for engine, status in _warmup_status.items()}
+
+
+def is_warmup_finished() -> bool:
+    """Check if every configured engine is either ready or failed."""
+    with _warmup_status_lock:
+        return all(
+            status["state"] in (WARMUP_READY, WARMUP_FAILED)
+            for status in _warmup_status.values()
+        )
+
+
+def is_ready(engine: str) -> bool:
+    """Check if an engine finished its warmup."""
+    with _warmup_status_lock:
+        status = _warmup_status.get(engine)
+        return status is not None and status["state"] == WARMUP_READY
@@ -0,0 +1,71 @@
+"""Microbenchmark for assembling a listening comprehension dialogue.
+
+Compares the repeated np.concatenate approach with the AudioAssembler on a dialogue with
+20 segments. Run from the src folder with:
+
+    python -m benchmarks.audio_assembly
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+from backend.audio_assembler import AudioAssembler
+
+SAMPLE_RATE = 24000
+
+
+def _create_dialogue(num_segments: int, segment_seconds: float) -> list[np.ndarray]:
+    rng = np.random.default_rng(0)
+    return [
+        rng.uniform(-1, 1, int(SAMPLE_RATE * segment_seconds)).astype(np.float32)
+        for _ in range(num_segments)
+    ]
+
+
+def concatenate(segments: list[np.ndarray]) -> tuple[int, np.ndarray]:
+    complete_audio = np.array([])
+
+    for segment in segments:
+        complete_audio = np.concatenate((complete_audio, segment))
+        complete_audio = np.concatenate((complete_audio, np.zeros(SAMPLE_RATE)))
+
+    return (SAMPLE_RATE, complete_audio)
+
+
+def assemble(segments: list[np.ndarray]) -> tuple[int, np.ndarray]:
+    assembler = AudioAssembler()
+
+    for segment in segments:
+        assembler.add_segment(SAMPLE_RATE, segment)
+        assembler.add_silence(1)
+
+    return assembler.build()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--segments", type=int, default=20)
+    parser.add_argument("--segment-seconds", type=float, default=5.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    segments = _create_dialogue(args.segments, args.segment_seconds)
+
+    for name, function in [
+        ("np.concatenate", concatenate),
+        ("AudioAssembler", assemble),
+    ]:
+        sr, audio = function(segments)
+        seconds = min(
+            timeit.repeat(lambda: function(segments), number=1, repeat=args.repeat)
+        )
+        print(
+            f"{name:>16}: {seconds * 1000:8.2f} ms  "
+            f"dtype={audio.dtype}  size={audio.nbytes / 1024 / 1024:.1f} MiB"
+        )
+
+
+if __name__ == "__main__":
+    main()
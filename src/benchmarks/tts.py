@@ -0,0 +1,374 @@
+"""Benchmark of the TTS backends on a fixed multilingual corpus.
+
+Every backend runs in its own process, so that the peak RSS of one backend does not
+influence the others. The local engines are used directly, the HTTP backends (OpenAI,
+ElevenLabs and Fish Audio) are pointed at local stand-in servers which stream synthetic
+audio. The results are written as JSON. Run from the src folder with:
+
+    python -m benchmarks.tts --output tts_benchmark.json
+"""
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import psutil
+
+from backend.tts_router import TTS_PROVIDER_NAMES
+
+CORPUS_VERSION = 1
+
+# Every entry is a list of (text, voice_id). Dialogues alternate between two voices.
+CORPUS = [
+    {
+        "name": "short_en",
+        "kind": "short",
+        "language": "English",
+        "segments": [("Good morning, how are you?", 0)],
+    },
+    {
+        "name": "short_ja",
+        "kind": "short",
+        "language": "Japanese",
+        "segments": [("おはようございます。お元気ですか？", 0)],
+    },
+    {
+        "name": "short_de",
+        "kind": "short",
+        "language": "German",
+        "segments": [("Guten Morgen, wie geht es dir?", 0)],
+    },
+    {
+        "name": "long_en",
+        "kind": "long",
+        "language": "English",
+        "segments": [
+            (
+                "The small town at the foot of the mountains was known for its weekly "
+                "market. Every Saturday, farmers from the surrounding villages brought "
+                "vegetables, cheese and bread to the square in front of the old church. "
+                "Visitors came from the city to enjoy the fresh food and the quiet "
+                "atmosphere. In recent years, however, more and more young people have "
+                "moved away, and the market has become smaller. The town council is now "
+                "discussing how to attract new residents without losing the charm that "
+                "made the town famous.",
+                0,
+            )
+        ],
+    },
+    {
+        "name": "long_ja",
+        "kind": "long",
+        "language": "Japanese",
+        "segments": [
+            (
+                "山のふもとにある小さな町は、毎週開かれる市場で知られています。"
+                "毎週土曜日になると、近くの村から農家の人たちが野菜やチーズ、パンを"
+                "古い教会の前の広場に持ってきます。都会からも多くの人が、新鮮な食べ物と"
+                "静かな雰囲気を楽しみに訪れます。しかし最近は若い人が町を離れることが増え、"
+                "市場も小さくなってきました。町では今、町の魅力を失わずに新しい住民を"
+                "呼び込む方法について話し合っています。",
+                0,
+            )
+        ],
+    },
+    {
+        "name": "dialogue_en",
+        "kind": "dialogue",
+        "language": "English",
+        "segments": [
+            ("Excuse me, is this the train to the airport?", 0),
+            ("No, this one goes to the city center. You need platform four.", 1),
+            ("Oh, thank you. How long does it take to get there?", 0),
+            ("About twenty minutes, but the next train leaves in five minutes.", 1),
+            ("Then I should hurry. Thanks again!", 0),
+        ],
+    },
+    {
+        "name": "dialogue_ja",
+        "kind": "dialogue",
+        "language": "Japanese",
+        "segments": [
+            ("すみません、この電車は空港に行きますか？", 0),
+            ("いいえ、これは町の中心に行きます。四番線に乗ってください。", 1),
+            ("ありがとうございます。どのくらいかかりますか？", 0),
+            ("二十分ぐらいですが、次の電車は五分後に出ます。", 1),
+            ("じゃあ、急ぎます。ありがとうございました。", 0),
+        ],
+    },
+]
+
+# Backends which are served by a stand-in server
+HTTP_BACKENDS = ["openai", "elevenlabs", "fish_audio"]
+
+STAND_IN_SAMPLE_RATE = 24000
+# Seconds of synthetic audio per character of the input text
+STAND_IN_SECONDS_PER_CHARACTER = 0.07
+STAND_IN_CHUNK_SECONDS = 0.1
+
+
+def _get_text_of_request(body: bytes) -> str:
+    """Read the input text of an OpenAI, ElevenLabs or Fish Audio request."""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        import ormsgpack
+
+        data = ormsgpack.unpackb(body)
+
+    return data.get("input") or data.get("text") or ""
+
+
+def _create_stand_in_handler(first_chunk_latency: float, speed: float):
+    class StandInHandler(BaseHTTPRequestHandler):
+        """Streams synthetic PCM audio. Fish Audio requests receive a WAV header first."""
+
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            text = _get_text_of_request(body)
+
+            samples = int(
+                len(text) * STAND_IN_SECONDS_PER_CHARACTER * STAND_IN_SAMPLE_RATE
+            )
+            audio = (
+                np.sin(np.arange(samples) * 2 * np.pi * 220 / STAND_IN_SAMPLE_RATE)
+                * 8000
+            ).astype(np.int16)
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            time.sleep(first_chunk_latency)
+
+            if self.path.endswith("/tts"):
+                self._write_chunk(
+                    b"RIFF"
+                    + struct.pack("<I", 0xFFFFFFFF)
+                    + b"WAVEfmt "
+                    + struct.pack(
+                        "<IHHIIHH",
+                        16,
+                        1,
+                        1,
+                        STAND_IN_SAMPLE_RATE,
+                        STAND_IN_SAMPLE_RATE * 2,
+                        2,
+                        16,
+                    )
+                    + b"data"
+                    + struct.pack("<I", 0xFFFFFFFF)
+                )
+
+            chunk_samples = int(STAND_IN_CHUNK_SECONDS * STAND_IN_SAMPLE_RATE)
+            for start in range(0, samples, chunk_samples):
+                self._write_chunk(audio[start : start + chunk_samples].tobytes())
+                # Stream faster than real time like the real services
+                time.sleep(STAND_IN_CHUNK_SECONDS / speed)
+
+            self._write_chunk(b"")
+
+    return StandInHandler
+
+
+def start_stand_in_server(first_chunk_latency: float, speed: float) -> str:
+    """Start a stand-in server for the HTTP backends on a free port.
+
+    Returns:
+        str: The base URL of the server.
+    """
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0), _create_stand_in_handler(first_chunk_latency, speed)
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _get_peak_rss() -> int:
+    memory_info = psutil.Process().memory_info()
+
+    # Windows reports the peak working set directly
+    if hasattr(memory_info, "peak_wset"):
+        return memory_info.peak_wset
+
+    import resource
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def _run_item(tts_provider: str, item: dict) -> dict:
+    from backend.audio import generate_audio
+
+    ttfc = None
+    audio_seconds = 0.0
+    output_bytes = 0
+
+    start = time.perf_counter()
+
+    for text, voice_id in item["segments"]:
+        for audio_data in generate_audio(
+            tts_provider, text, item["language"], voice_id, use_cache=False
+        ):
+            if ttfc is None:
+                ttfc = time.perf_counter() - start
+
+            audio_seconds += audio_data.duration
+            output_bytes += audio_data.data.nbytes
+
+    total_time = time.perf_counter() - start
+
+    return {
+        "name": item["name"],
+        "kind": item["kind"],
+        "language": item["language"],
+        "ttfc": ttfc,
+        "total_time": total_time,
+        "audio_seconds": audio_seconds,
+        # Processing time per second of audio, below 1 is faster than real time
+        "rtf": total_time / audio_seconds if audio_seconds > 0 else None,
+        "output_bytes": output_bytes,
+    }
+
+
+def _median(values: list[float | None]) -> float | None:
+    values = [value for value in values if value is not None]
+    return float(np.median(values)) if values else None
+
+
+def run_backend(backend: str, repeat: int) -> dict:
+    """Run the corpus through a backend. This is executed in a separate process.
+
+    Returns:
+        dict: The measurements of every corpus item and repetition, the time of the first
+            call which includes loading the backend and the peak RSS of the process.
+    """
+    logging.basicConfig(level=logging.WARNING)
+
+    tts_provider = TTS_PROVIDER_NAMES[backend]
+
+    from backend.phoneme_cache import phoneme_cache
+
+    # Like the audio cache the phoneme cache is disabled, otherwise the repetitions would
+    # measure the phonemes which were cached by the first call
+    phoneme_cache.path = None
+    phoneme_cache.max_entries = 0
+
+    try:
+        # The first call loads the models or creates the clients
+        start = time.perf_counter()
+        _run_item(tts_provider, CORPUS[0])
+        load_time = time.perf_counter() - start
+
+        items = [
+            _run_item(tts_provider, item) for _ in range(repeat) for item in CORPUS
+        ]
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}", "peak_rss_bytes": _get_peak_rss()}
+
+    return {
+        "load_time": load_time,
+        "peak_rss_bytes": _get_peak_rss(),
+        "items": items,
+        "summary": {
+            kind: {
+                metric: _median([i[metric] for i in items if i["kind"] == kind])
+                for metric in ["ttfc", "total_time", "rtf"]
+            }
+            for kind in sorted({i["kind"] for i in items})
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--backends",
+        default=",".join(TTS_PROVIDER_NAMES),
+        help="Comma separated list of backends",
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--stand-in-latency",
+        type=float,
+        default=0.2,
+        help="Time until the stand-in servers send the first chunk in seconds",
+    )
+    parser.add_argument(
+        "--stand-in-speed",
+        type=float,
+        default=10.0,
+        help="How much faster than real time the stand-in servers stream",
+    )
+    parser.add_argument("--output", help="File for the JSON results, default stdout")
+    args = parser.parse_args()
+
+    backends = [backend.strip() for backend in args.backends.split(",")]
+
+    if any(backend in HTTP_BACKENDS for backend in backends):
+        url = start_stand_in_server(args.stand_in_latency, args.stand_in_speed)
+
+        # The backend processes inherit the environment
+        os.environ["OPENAI_BASE_URL"] = f"{url}/v1"
+        os.environ["OPENAI_API_KEY"] = "benchmark"
+        os.environ["LLA_AGENT_ELEVENLABS_URL"] = url
+        os.environ["ELEVENLABS_API_KEY"] = "benchmark"
+        os.environ["LLA_AGENT_FISH_AUDIO_URL"] = url
+
+    results = dict()
+    for backend in backends:
+        if backend not in TTS_PROVIDER_NAMES:
+            parser.error(f"Unknown backend {backend}")
+
+        print(f"Benchmarking {backend}...", file=sys.stderr)
+
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            results[backend] = pool.submit(run_backend, backend, args.repeat).result()
+
+        if backend in HTTP_BACKENDS:
+            results[backend]["stand_in"] = True
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "corpus_version": CORPUS_VERSION,
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=4, ensure_ascii=False)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
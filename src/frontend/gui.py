@@ -2,6 +2,7 @@ import os
 
 import gradio as gr
 
+import frontend.tabs.shared as F
 from frontend.tabs import (
     create_conversation_exercise_tab,
     create_free_text_questions_tab,
@@ -113,6 +114,18 @@ def create_gui() -> gr.Blocks:
                 MessageManager().getMessages().label_tts_provider(),
             )
 
+            engine_status = gr.Textbox(
+                value=F.get_engine_status,
+                interactive=False,
+                label=MessageManager().getMessages().label_engine_status(),
+            )
+            # Only polls while the engines are warmed up
+            engine_status_timer = gr.Timer(2)
+            engine_status_timer.tick(
+                F.update_engine_status,
+                outputs=[engine_status, engine_status_timer],
+            )
+
             is_stream = create_checkbox_input(
                 browser_state,
                 "option_is_stream",
@@ -1,11 +1,14 @@
 import logging
+import time
 
 import gradio as gr
 from gradio_toggle import Toggle
 
 import frontend.tabs.shared as F
 import prompts
+from backend.audio_data import AudioData
 from backend.question_generator import tools as QGT
+from backend.time_stretch import SPEED_VARIANTS
 from frontend.tabs.messages.message_manager import MessageManager
 from frontend.tabs.util import create_chatbot, create_textbox_with_audio_input
 
@@ -115,7 +118,24 @@ def create_listening_comprehension_question_tab(
                             submit_btn=True,
                         )
 
-                    audio_player = gr.Audio(interactive=False, type="numpy")
+                    audio_player = gr.Audio(
+                        interactive=False, type="numpy", streaming=True, autoplay=True
+                    )
+                    playback_speed = gr.Radio(
+                        choices=[(f"{speed}x", speed) for speed in SPEED_VARIANTS],
+                        value=1.0,
+                        label=MessageManager().getMessages().label_playback_speed(),
+                    )
+                    with gr.Row():
+                        replay_line = gr.Dropdown(
+                            choices=[],
+                            label=MessageManager().getMessages().label_replay_line(),
+                            scale=2,
+                        )
+                        replay_line_button = gr.Button(
+                            MessageManager().getMessages().button_replay_line(),
+                            scale=1,
+                        )
 
         chatbot = create_chatbot(
             MessageManager().getMessages().placeholder_chatbot_evaluation()
@@ -137,6 +157,7 @@ def create_listening_comprehension_question_tab(
                 additional_information,
                 mode_switch,
                 tts_provider,
+                playback_speed,
             ],
             [
                 create_state,
@@ -148,6 +169,21 @@ def create_listening_comprehension_question_tab(
                 answer,
                 audio_player,
             ],
+        ).then(get_listening_comprehension_lines, [create_state], [replay_line])
+
+        # The speed variants are stretched from the rendered audio without new TTS calls
+        playback_speed.change(
+            change_listening_comprehension_speed,
+            [create_state, playback_speed],
+            [audio_player],
+        )
+
+        # A line is sliced from the rendered audio without new TTS calls and played at the
+        # chosen speed
+        replay_line_button.click(
+            replay_listening_comprehension_line,
+            [create_state, replay_line, playback_speed],
+            [audio_player],
         )
 
         show_text_button.click(
@@ -199,9 +235,12 @@ async def create_listening_comprehension_question(
     additional_information: str,
     mode_switch: bool,
     tts_provider: str,
+    playback_speed: float,
 ):
     F.verify_input(language, language_proficiency, difficulty)
 
+    start = time.perf_counter()
+
     state, question_generator = F.get_question_generator(state, model)
 
     yield (
@@ -223,6 +262,9 @@ async def create_listening_comprehension_question(
         mode_switch,
         tts_provider,
     ):
+        # The stream is consumed here and must not be kept in the state
+        audio_stream = question_data.pop(QGT.AUDIO_STREAM, None)
+
         state["listening_comprehension_data"] = question_data
         topic = f"{question_data[QGT.LISTENING_COMPREHENSION_TOPIC]}"
         speakers = question_data[QGT.LISTENING_COMPREHENSION_SPEAKERS]
@@ -245,8 +287,49 @@ async def create_listening_comprehension_question(
                 gr.skip(),
                 gr.Textbox(value=question),
                 gr.Textbox(value="", info=""),
-                question_data[QGT.AUDIO_DATA],
+                await F.get_audio_file(question_data[QGT.AUDIO_DATA], playback_speed)
+                if audio_stream is None
+                else gr.skip(),
             )
+
+            if audio_stream is not None:
+                first_chunk = True
+                async for audio_chunk in audio_stream:
+                    if first_chunk:
+                        logger.info(
+                            f"Time to first sound: {time.perf_counter() - start:.2f}s"
+                        )
+                        first_chunk = False
+
+                    yield (
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        audio_chunk,
+                    )
+
+                # The stream is played at the normal speed, the chosen speed is only
+                # available once the complete audio is known
+                if (
+                    playback_speed != 1.0
+                    and question_data.get(QGT.AUDIO_DATA) is not None
+                ):
+                    yield (
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        gr.skip(),
+                        await F.get_audio_file(
+                            question_data[QGT.AUDIO_DATA], playback_speed
+                        ),
+                    )
         else:
             yield (
                 state,
@@ -260,6 +343,52 @@ async def create_listening_comprehension_question(
             )
 
 
+async def change_listening_comprehension_speed(state: dict, playback_speed: float):
+    data = state.get("listening_comprehension_data")
+
+    # Nothing to replay before the audio of the question is complete
+    if data is None or data.get(QGT.AUDIO_DATA) is None:
+        yield gr.skip()
+        return
+
+    yield await F.get_audio_file(data[QGT.AUDIO_DATA], playback_speed)
+
+
+def get_listening_comprehension_lines(state: dict):
+    """Create the choices for the replay of a single line of the dialogue."""
+    data = state.get("listening_comprehension_data")
+
+    if data is None:
+        return gr.Dropdown(choices=[], value=None)
+
+    # The first segment of the audio is the topic, the dialogue starts with the second
+    choices = [
+        (f"{i + 1}. {text_segment['speaker']}", i + 1)
+        for i, text_segment in enumerate(data[QGT.LISTENING_COMPREHENSION_TEXT])
+    ]
+
+    return gr.Dropdown(choices=choices, value=None)
+
+
+async def replay_listening_comprehension_line(
+    state: dict, segment: int | None, playback_speed: float
+):
+    data = state.get("listening_comprehension_data")
+
+    # Nothing to replay before the audio of the question is complete or if no segment
+    # produced audio
+    if segment is None or data is None or not data.get(QGT.AUDIO_TIMINGS):
+        yield gr.skip()
+        return
+
+    sr, audio = data[QGT.AUDIO_DATA]
+    timing = data[QGT.AUDIO_TIMINGS][segment]
+
+    yield await F.get_audio_file(
+        AudioData(sr, audio[timing.start_sample : timing.end_sample]), playback_speed
+    )
+
+
 async def show_listening_comprehension_text(state):
     role_mapping = ["assistant", "user"]
 
@@ -120,3 +120,15 @@ class ENMessages(Messages):
 
     def label_tts_provider(self):
         return "TTS Provider"
+
+    def label_engine_status(self):
+        return "Engine Status"
+
+    def label_playback_speed(self):
+        return "Playback Speed"
+
+    def label_replay_line(self):
+        return "Line"
+
+    def button_replay_line(self):
+        return "Replay Line"
@@ -120,3 +120,15 @@ class Messages(metaclass=ABCMeta):
 
     @abstractmethod
     def label_tts_provider(self) -> str: ...
+
+    @abstractmethod
+    def label_engine_status(self) -> str: ...
+
+    @abstractmethod
+    def label_playback_speed(self) -> str: ...
+
+    @abstractmethod
+    def label_replay_line(self) -> str: ...
+
+    @abstractmethod
+    def button_replay_line(self) -> str: ...
@@ -210,9 +210,13 @@ async def create_reading_comprehension_question(
                 gr.TextArea(value=wrapped_text, visible=False),
                 gr.Textbox(value=question, visible=False),
                 gr.Textbox(value="", info=""),
-                question_data[QGT.AUDIO_DATA],
+                await F.get_audio_file(question_data[QGT.AUDIO_DATA]),
             )
         else:
+            # The audio is rendered while the user reads, so that the audio button
+            # responds immediately
+            F.prerender_audio(tts_provider, language, topic, wrapped_text, question)
+
             yield (
                 state,
                 gr.Textbox(value=topic),
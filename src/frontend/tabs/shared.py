@@ -1,20 +1,39 @@
 """Shared functions for the frontend tabs"""
 
+import asyncio
 import logging
+from collections import OrderedDict
 
 import gradio as gr
 import numpy as np
 from llama_index.core.workflow import Context
 
 import prompts
-from backend.audio import generate_audio
+from backend.audio import (
+    agenerate_audio,
+    get_kokoro_pool_stats,
+    get_phoneme_cache_stats,
+    get_tts_router_stats,
+)
+from backend.audio_assembler import AudioAssembler
+from backend.audio_cache import normalize_text
+from backend.audio_data import AudioData
+from backend.audio_encoder import encode_audio
 from backend.chatbot.chatbot_workflow import ChatBotWorkfLow
 from backend.events import AudioStreamEvent, ChatBotStartEvent, LLMProgressEvent
+from backend.model_registry import model_registry
 from backend.question_generator.base import QuestionBuffer, QuestionGenerator
+from backend.warmup import get_warmup_status, is_warmup_finished
 from util import const
 
 logger = logging.getLogger(__name__)
 
+# Number of questions whose rendered audio is kept
+MAX_PRERENDERED_AUDIO = 16
+
+# Rendering of the audio files, keyed by the provider, language and texts
+_prerendered_audio: OrderedDict[tuple, asyncio.Task] = OrderedDict()
+
 
 def get_question_generator(state: dict, model: str):
     """Creates a Question Generator. Creates a new Question Buffer if none exists in the state. Otherwise reuses the existing one."""
@@ -222,21 +241,149 @@ def verify_input(language: str, language_proficiency: str, difficulty: str):
         raise gr.Error("No difficulty was input. Please add one in the right sidebar.")
 
 
-async def get_audio(tts_provider: str, language: str, *args: tuple[str]):
-    """Generates audio for the given texts using the specified TTS provider and language."""
-    complete_audio = np.array([])
+async def _render_audio(
+    tts_provider: str, language: str, texts: tuple[str]
+) -> AudioData | None:
+    assembler = AudioAssembler(dtype=np.int16)
 
-    for text in args:
-        for sr, audio_np in generate_audio(tts_provider, text, language):
+    for text in texts:
+        async for sr, audio_np in agenerate_audio(tts_provider, text, language):
             logger.info(
                 f"Generated audio chunk with shape {audio_np.shape} and sample rate {sr}"
             )
-            complete_audio = np.concatenate((complete_audio, audio_np))
+            assembler.add_segment(sr, audio_np)
+
+        assembler.add_silence(2)
+
+    return assembler.build()
+
+
+def _has_failed(task: asyncio.Task) -> bool:
+    return task.done() and (task.cancelled() or task.exception() is not None)
+
+
+def _log_prerender_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Rendering of the audio failed: {task.exception()}")
+
+
+def prerender_audio(tts_provider: str, language: str, *texts: str) -> asyncio.Task:
+    """Start rendering the audio of the texts in the background. The result is cached, so
+    get_audio returns it without rendering the texts again. The audio is kept instead of the
+    encoded file, because the file can be pruned from the encoder cache in the meantime.
+
+    Args:
+        tts_provider (str): The TTS provider.
+        language (str): The language of the texts.
+        *texts (str): The texts, they are separated by silence.
+
+    Returns:
+        asyncio.Task: Resolves to the rendered audio.
+    """
+    key = (tts_provider, language, tuple(normalize_text(text) for text in texts))
+
+    task = _prerendered_audio.get(key)
+
+    # A failed rendering is retried
+    if task is None or _has_failed(task):
+        task = asyncio.create_task(_render_audio(tts_provider, language, texts))
+        task.add_done_callback(_log_prerender_error)
+        _prerendered_audio[key] = task
+
+        while len(_prerendered_audio) > MAX_PRERENDERED_AUDIO:
+            _prerendered_audio.popitem(last=False)
+
+    _prerendered_audio.move_to_end(key)
+
+    return task
+
+
+async def get_audio(tts_provider: str, language: str, *args: tuple[str]):
+    """Generates audio for the given texts using the specified TTS provider and language.
+    Audio which was already rendered or prerendered for the same texts is reused."""
+    # The rendering continues for later requests if this event is cancelled
+    audio_data = await asyncio.shield(prerender_audio(tts_provider, language, *args))
 
-        complete_audio = np.concatenate((complete_audio, np.zeros(2 * sr)))
+    # The file is only encoded again if it was pruned
+    yield await get_audio_file(audio_data)
 
-    yield (sr, complete_audio)
+
+async def get_audio_file(
+    audio_data: AudioData | None, speed: float = 1.0
+) -> str | None:
+    """Encodes audio into a compressed file for the audio players. Every clip and speed variant
+    is only encoded once."""
+    if audio_data is None:
+        return None
+
+    return str(
+        await asyncio.to_thread(encode_audio, AudioData(*audio_data), speed=speed)
+    )
 
 
 def clear():
     return None
+
+
+def get_engine_status() -> str:
+    """Describe the warmup state of the local engines, the memory of the loaded models, the
+    reuse of the Kokoro pipelines, the phoneme cache and the routing of the TTS requests."""
+    status = get_warmup_status()
+
+    if len(status) == 0:
+        lines = ["No engines are warmed up."]
+    else:
+        lines = []
+
+    for engine, engine_status in status.items():
+        line = f"{engine}: {engine_status['state']}"
+        if engine_status["load_time"] is not None:
+            line += f" ({engine_status['load_time']:.1f}s)"
+        lines.append(line)
+
+    model_stats = model_registry.stats()
+    lines.append(
+        f"Models: {model_stats['resident_bytes'] / 2**20:.0f} of {model_stats['budget_bytes'] / 2**20:.0f} MiB"
+    )
+    for model in model_stats["models"]:
+        lines.append(
+            f"  {model['name']} ({model['device']}): {model['resident_bytes'] / 2**20:.0f} MiB"
+        )
+
+    kokoro_stats = get_kokoro_pool_stats()
+    if kokoro_stats["constructions"] > 0:
+        lines.append(
+            f"Kokoro pipelines: {kokoro_stats['constructions']} created, {kokoro_stats['reuses']} reused, saved {kokoro_stats['saved_time']:.1f}s"
+        )
+
+    phoneme_stats = get_phoneme_cache_stats()
+    if (
+        phoneme_stats["misses"]
+        + phoneme_stats["memory_hits"]
+        + phoneme_stats["disk_hits"]
+        > 0
+    ):
+        lines.append(
+            f"Phoneme cache: {phoneme_stats['hit_rate']:.0%} hits ({phoneme_stats['memory_hits']} memory, {phoneme_stats['disk_hits']} disk), {phoneme_stats['misses']} misses, saved {phoneme_stats['saved_time']:.1f}s"
+        )
+
+    router_stats = get_tts_router_stats()
+    if len(router_stats["providers"]) > 0:
+        lines.append("TTS providers:")
+    for provider, provider_stats in router_stats["providers"].items():
+        line = f"  {provider}: {provider_stats['calls']} calls, {provider_stats['error_rate']:.0%} errors, {provider_stats['timeouts']} timeouts"
+        if provider_stats["latency_p50"] is not None:
+            line += f", first chunk p50 {provider_stats['latency_p50']:.2f}s p95 {provider_stats['latency_p95']:.2f}s"
+        if not provider_stats["healthy"]:
+            line += ", unhealthy"
+        lines.append(line)
+
+    for decision, count in router_stats["decisions"].items():
+        lines.append(f"  {decision}: {count} requests")
+
+    return "\n".join(lines)
+
+
+def update_engine_status():
+    """Refresh the engine status. The timer is stopped once every engine finished its warmup."""
+    return get_engine_status(), gr.Timer(active=not is_warmup_finished())
@@ -98,7 +98,7 @@ def create_checkbox_input(browser_state: gr.BrowserState, key_name: str, label:
 
 def create_audio_output(tts_provider, language, *text_input_elements):
     with gr.Group():
-        audio_player = gr.Audio(interactive=False, scale=4, type="numpy")
+        audio_player = gr.Audio(interactive=False, scale=4, type="filepath")
         generate_button = gr.Button("Generate Audio", scale=1)
 
     generate_button.click(
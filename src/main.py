@@ -5,7 +5,14 @@ import gradio as gr
 from openinference.instrumentation.llama_index import LlamaIndexInstrumentor
 from phoenix.otel import register
 
-from backend.audio import init_fish_audio_voice_samples
+from backend.audio import (
+    init_fish_audio_voice_samples,
+    init_kokoro_pipelines,
+    warmup_chatterbox,
+)
+from backend.audio_encoder import encoded_path
+from backend.tts_worker import start_tts_workers
+from backend.warmup import start_warmup
 from util.model import init_models
 
 logging.getLogger("faster_whisper").setLevel(logging.DEBUG)
@@ -19,6 +26,23 @@ if __name__ == "__main__":
     init_models()
 
     from frontend.gui import create_gui
+    from frontend.tabs.util import transcriber
+
+    warmup_functions = {
+        "kokoro": init_kokoro_pipelines,
+        "chatterbox": warmup_chatterbox,
+        "whisper": transcriber.warmup,
+    }
+
+    # The worker processes warm up their engines themselves
+    tts_worker_pool = start_tts_workers()
+    if tts_worker_pool is not None:
+        warmup_functions["kokoro"] = tts_worker_pool.wait_until_ready
+        warmup_functions["chatterbox"] = tts_worker_pool.wait_until_ready
+
+    # Load the local engines in the background, so that the first request does not need to
+    # wait for the model to load
+    start_warmup(warmup_functions)
 
     css_path = (
         Path(__file__).parents[0] / Path("..") / Path("resource") / Path("style.css")
@@ -41,4 +65,5 @@ if __name__ == "__main__":
     ) as demo:
         create_gui()
 
-    demo.launch()
+    # The encoded audio files are served to the audio players
+    demo.launch(allowed_paths=[str(encoded_path.resolve())])
@@ -1,28 +1,115 @@
 import difflib
+from functools import cache, lru_cache
 
 import pycountry
 
+# Number of unknown language names whose fuzzy match is kept
+FUZZY_CACHE_SIZE = 256
 
-def get_language_code(language_name: str) -> str | None:
-    language_name = language_name.lower()
+# Alternative english names which are not part of pycountry
+LANGUAGE_ALIASES = {
+    "mandarin": "zh",
+    "cantonese": "zh",
+    "farsi": "fa",
+    "brazilian portuguese": "pt",
+    "castilian": "es",
+    "flemish": "nl",
+    "filipino": "tl",
+    "greek": "el",
+}
+
+# Names of the languages in the language itself
+NATIVE_LANGUAGE_NAMES = {
+    "日本語": "ja",
+    "にほんご": "ja",
+    "中文": "zh",
+    "汉语": "zh",
+    "漢語": "zh",
+    "普通话": "zh",
+    "한국어": "ko",
+    "deutsch": "de",
+    "français": "fr",
+    "español": "es",
+    "italiano": "it",
+    "português": "pt",
+    "nederlands": "nl",
+    "русский": "ru",
+    "polski": "pl",
+    "türkçe": "tr",
+    "svenska": "sv",
+    "norsk": "no",
+    "dansk": "da",
+    "suomi": "fi",
+    "ελληνικά": "el",
+    "العربية": "ar",
+    "עברית": "he",
+    "हिन्दी": "hi",
+    "ไทย": "th",
+    "tiếng việt": "vi",
+    "bahasa indonesia": "id",
+    "українська": "uk",
+    "čeština": "cs",
+    "magyar": "hu",
+}
+
+
+@cache
+def _get_language_index() -> dict[str, str]:
+    """Map the lower case names and codes of all languages with an alpha 2 code to the code."""
+    index = dict()
+
+    languages = [lang for lang in pycountry.languages if hasattr(lang, "alpha_2")]
+
+    # Official names take precedence over the other names
+    for lang in languages:
+        index.setdefault(lang.name.lower(), lang.alpha_2)
+
+    # Names without their qualifier, e.g. "Malay (macrolanguage)"
+    for lang in languages:
+        index.setdefault(lang.name.split(" (")[0].lower(), lang.alpha_2)
+
+    for lang in languages:
+        for attribute in ["common_name", "inverted_name", "alpha_3", "bibliographic"]:
+            if hasattr(lang, attribute):
+                index.setdefault(getattr(lang, attribute).lower(), lang.alpha_2)
+        index.setdefault(lang.alpha_2.lower(), lang.alpha_2)
+
+    for names in [LANGUAGE_ALIASES, NATIVE_LANGUAGE_NAMES]:
+        for name, code in names.items():
+            index.setdefault(name, code)
 
-    # Build a list of language names and their objects
-    all_languages = {
-        lang.name.lower(): lang
-        for lang in pycountry.languages
-        if hasattr(lang, "alpha_2")
-    }
+    return index
 
-    # Try direct match first
-    if language_name in all_languages:
-        return all_languages[language_name].alpha_2
 
-    # Fuzzy match
+@lru_cache(maxsize=FUZZY_CACHE_SIZE)
+def _get_closest_language_code(language_name: str) -> str | None:
+    index = _get_language_index()
+
     closest_matches = difflib.get_close_matches(
-        language_name, all_languages.keys(), n=1, cutoff=0.8
+        language_name, index.keys(), n=1, cutoff=0.8
     )
     if closest_matches:
-        match = closest_matches[0]
-        return all_languages[match].alpha_2
+        return index[closest_matches[0]]
 
     return None
+
+
+def get_language_code(language_name: str) -> str | None:
+    """Get the ISO 639-1 code of a language.
+
+    The language can be given by its english name, an alias, its native name or its code.
+    Unknown names are matched to the closest known name.
+
+    Args:
+        language_name (str): The name of the language.
+
+    Returns:
+        str | None: The code, None if no language matches.
+    """
+    language_name = language_name.strip().lower()
+
+    code = _get_language_index().get(language_name)
+    if code is not None:
+        return code
+
+    return _get_closest_language_code(language_name)
@@ -5,6 +5,8 @@ from typing import Any, Callable, Tuple
 import numpy as np
 from RealtimeSTT import AudioToTextRecorder
 
+from backend.model_registry import ModelKey, model_registry
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,7 +51,10 @@ class AudioTranscriber:
     def __init__(
         self, handle_output_while_not_recording: Callable[[Any], str | dict] = None
     ) -> None:
-        self.recorder = self._create_recorder()
+        # The recorder loads the whisper models, it is created by load or on the first recording
+        self.recorder: AudioToTextRecorder | None = None
+        self._recorder_lock = threading.Lock()
+        self._recorder_ready = threading.Event()
 
         self.full_sentences = []
         self.displayed_text = ""
@@ -64,7 +69,38 @@ class AudioTranscriber:
 
         threading.Thread(target=self._handle_audio, daemon=True).start()
 
+    def _get_model_key(self) -> ModelKey:
+        return ModelKey(
+            f"realtimestt/{self._recorder_config['model']}",
+            self._recorder_config.get("device", "cuda"),
+            self._recorder_config.get("compute_type", "default"),
+        )
+
+    def load(self) -> None:
+        """Create the recorder and load the whisper models if this did not happen yet.
+
+        The recorder runs its models in its own processes, so they can not be shared with the
+        other whisper users. It is registered to report its size and is never released, because
+        the recorder is used for the whole lifetime of the application.
+        """
+        with self._recorder_lock:
+            if self.recorder is None:
+                self.recorder = model_registry.acquire(
+                    self._get_model_key(), self._create_recorder
+                )
+                self._recorder_ready.set()
+
+    def warmup(self) -> None:
+        """Load the recorder and transcribe one second of silence, so that the first
+        transcription does not need to initialize the whisper model."""
+        self.load()
+        self.recorder.perform_final_transcription(
+            np.zeros(16000, dtype=np.float32), use_prompt=False
+        )
+
     def _handle_audio(self) -> None:
+        self._recorder_ready.wait()
+
         while True:
             self.recorder.text(self._process_text)
 
@@ -142,6 +178,7 @@ class AudioTranscriber:
 
     def start_recording(self) -> None:
         logger.info("Starting recording...")
+        self.load()
         self.recording = True
         self.recorder.start()
 
@@ -150,11 +187,18 @@ class AudioTranscriber:
         self.full_sentences = []
         self.displayed_text = ""
         self.prev_text = ""
+
+        if self.recorder is None:
+            return
+
         self.recorder.clear_audio_queue()
         self.recorder.stop()
         logger.info("Stopped recording...")
 
     def feed_audio(self, audio_chunk: Tuple[int, np.ndarray]) -> None:
+        if self.recorder is None:
+            return
+
         self.recorder.feed_audio(audio_chunk[1], original_sample_rate=audio_chunk[0])
 
     def get_text(self, *args) -> str: